@@ -1,9 +1,28 @@
 from functools import reduce
+import os
+import sqlite3
 from typing import Tuple, Dict, Any
 import pandas as pd
 import streamlit as st
 import numpy as np
-import altair as alt
+
+from renown_chime import RECOVERY_DAYS, cached_projection, derive_parameters, metrics
+from renown_chime.charts import (
+    additional_projections_chart, admitted_patients_chart, census_bands_chart, new_admissions_chart,
+    chart_spec, facility_census_chart, schedule_comparison_chart, tornado_chart,
+)
+from renown_chime.capacity import CAPACITY, capacity_report, capacity_table, exceedance_probability
+from renown_chime.projections import build_projection_batch, daily_census, projection_cache, projection_key
+from renown_chime.regions import COUNTIES, S_DEFAULT, cached_regional_projection, parse_regions, regional_census_frame
+from renown_chime.schedules import contact_schedules, parse_schedule
+from renown_chime.sensitivity import cached_sensitivity, tornado
+from renown_chime.ensemble import cached_ensemble, parse_distributions
+from renown_chime.fitting import cached_fit, parse_census
+from renown_chime.ode import ENGINES
+from renown_chime.store import ScenarioStore, diff, stack_census
+
+metrics.serve()
+rerun_started = metrics.clock()
 
 hide_menu_style = """
         <style>
@@ -12,74 +31,153 @@ hide_menu_style = """
         """
 st.markdown(hide_menu_style, unsafe_allow_html=True)
 
-delaware = 564696
-chester = 519293
-montgomery = 826075
-bucks = 628341
-philly = 1581000
-S_default = delaware + chester + montgomery + bucks + philly
+chart_payload_bytes = 0  # Vega-Lite spec bytes sent by this rerun
+
+
+def show_chart(chart, *args):
+    """Draw chart(*args) from the shared spec cache."""
+    global chart_payload_bytes
+    with metrics.timer("charts"):
+        spec = chart_spec(chart, *args)
+        chart_payload_bytes += spec.payload_bytes
+        st.vega_lite_chart(spec.spec, use_container_width=True)
+
+
+def show_dataframe(data):
+    with metrics.timer("dataframe"):
+        st.dataframe(data)
+
+
+S_default = S_DEFAULT
 known_infections = 91 # update daily
 known_cases = 4 # update daily
 
 # Widgets
+
+def keyed_default(key, value):
+    """Default for a widget whose value calibration or a saved scenario can set, see apply_fit.
+
+    Once the widget's key is in session state the widget must not be given
+    a value as well.
+    """
+    return None if key in st.session_state else value
+
+
 current_hosp = st.sidebar.number_input(
-    "Currently Hospitalized COVID-19 Patients", value=known_cases, step=1, format="%i"
+    "Currently Hospitalized COVID-19 Patients", value=keyed_default("current_hosp", known_cases), step=1,
+    format="%i", key="current_hosp",
 )
 
 doubling_time = st.sidebar.number_input(
-    "Doubling time before social distancing (days)", value=6, step=1, format="%i"
+    "Doubling time before social distancing (days)", 0.5, None, value=keyed_default("doubling_time", 6.0),
+    step=1.0, format="%.2f", key="doubling_time",
 )
 relative_contact_rate = st.sidebar.number_input(
-    "Social distancing (% reduction in social contact)", 0, 100, value=0, step=5, format="%i"
+    "Social distancing (% reduction in social contact)", 0, 100, value=keyed_default("relative_contact_rate", 0),
+    step=5, format="%i", key="relative_contact_rate",
 )/100.0
+schedule_text = st.sidebar.text_input(
+    "Later changes in social distancing (day:% pairs)", value=keyed_default("schedule_text", ""),
+    help="e.g. 14:30, 45:10 for a 30% reduction from day 14, relaxed to 10% on day 45", key="schedule_text",
+)
+try:
+    schedule = parse_schedule(schedule_text)
+except ValueError as e:
+    st.sidebar.error(str(e))
+    schedule = []
 
 hosp_rate = (
-    st.sidebar.number_input("Hospitalization %(total infections)", 0.0, 100.0, value=5.0, step=1.0, format="%f")
+    st.sidebar.number_input(
+        "Hospitalization %(total infections)", 0.0, 100.0, value=keyed_default("hosp_rate", 5.0), step=1.0,
+        format="%f", key="hosp_rate",
+    )
     / 100.0
 )
 icu_rate = (
-    st.sidebar.number_input("ICU %(total infections)", 0.0, 100.0, value=2.0, step=1.0, format="%f") / 100.0
+    st.sidebar.number_input(
+        "ICU %(total infections)", 0.0, 100.0, value=keyed_default("icu_rate", 2.0), step=1.0, format="%f",
+        key="icu_rate",
+    )
+    / 100.0
 )
 vent_rate = (
-    st.sidebar.number_input("Ventilated %(total infections)", 0.0, 100.0, value=1.0, step=1.0, format="%f")
+    st.sidebar.number_input(
+        "Ventilated %(total infections)", 0.0, 100.0, value=keyed_default("vent_rate", 1.0), step=1.0,
+        format="%f", key="vent_rate",
+    )
     / 100.0
 )
-hosp_los = st.sidebar.number_input("Hospital Length of Stay", value=7, step=1, format="%i")
-icu_los = st.sidebar.number_input("ICU Length of Stay", value=9, step=1, format="%i")
-vent_los = st.sidebar.number_input("Vent Length of Stay", value=10, step=1, format="%i")
+hosp_los = st.sidebar.number_input(
+    "Hospital Length of Stay", value=keyed_default("hosp_los", 7), step=1, format="%i", key="hosp_los"
+)
+icu_los = st.sidebar.number_input(
+    "ICU Length of Stay", value=keyed_default("icu_los", 9), step=1, format="%i", key="icu_los"
+)
+vent_los = st.sidebar.number_input(
+    "Vent Length of Stay", value=keyed_default("vent_los", 10), step=1, format="%i", key="vent_los"
+)
 Penn_market_share = (
     st.sidebar.number_input(
-        "Hospital Market Share (%)", 0.0, 100.0, value=15.0, step=1.0, format="%f"
+        "Hospital Market Share (%)", 0.0, 100.0, value=keyed_default("market_share", 15.0), step=1.0, format="%f",
+        key="market_share",
     )
     / 100.0
 )
 S = st.sidebar.number_input(
-    "Regional Population", value=S_default, step=100000, format="%i"
+    "Regional Population", value=keyed_default("S", S_default), step=100000, format="%i", key="S"
 )
 
 initial_infections = st.sidebar.number_input(
     "Currently Known Regional Infections (only used to compute detection rate - does not change projections)", value=known_infections, step=10, format="%i"
 )
+capacity = (
+    st.sidebar.number_input("Hospital beds available for COVID-19", 0, value=CAPACITY["hosp"], step=10, format="%i"),
+    st.sidebar.number_input("ICU beds available for COVID-19", 0, value=CAPACITY["icu"], step=5, format="%i"),
+    st.sidebar.number_input("Ventilators available for COVID-19", 0, value=CAPACITY["vent"], step=5, format="%i"),
+)
 
-total_infections = current_hosp / Penn_market_share / hosp_rate
-detection_prob = initial_infections / total_infections
-
-S, I, R = S, initial_infections / detection_prob, 0
-
-intrinsic_growth_rate = 2 ** (1 / doubling_time) - 1
 
-recovery_days = 14.0
-# mean recovery rate, gamma, (in 1/days).
-gamma = 1 / recovery_days
+def apply_fit(fit, observed):
+    """Seed the sidebar with fitted values; runs as a callback, before the widgets are drawn."""
+    st.session_state["current_hosp"] = int(observed[-1])
+    st.session_state["doubling_time"] = fit.doubling_time
+    st.session_state["relative_contact_rate"] = int(round(fit.relative_contact_rate * 100))
 
-# Contact rate, beta
-beta = (
-    intrinsic_growth_rate + gamma
-) / S * (1-relative_contact_rate) # {rate based on doubling time} / {initial S}
 
-r_t = beta / gamma * S # r_t is r_0 after distancing
-r_naught = r_t / (1-relative_contact_rate)
-doubling_time_t = 1/np.log2(beta*S - gamma +1) # doubling time after distancing
+with st.sidebar.expander("Calibrate from observed census"):
+    census_history = st.text_area(
+        "Daily COVID-19 hospital census, oldest first and ending today", help="e.g. 2, 3, 3, 5, 6, 8"
+    )
+    fit_change_point = st.checkbox("Also fit a change in social distancing")
+    if census_history.strip():
+        try:
+            observed = parse_census(census_history)
+            fit = cached_fit(
+                observed, hosp_rate, Penn_market_share, hosp_los, S,
+                relative_contact_rate=0.0 if fit_change_point else relative_contact_rate,
+                change_point=fit_change_point,
+            )
+        except ValueError as e:
+            st.error(str(e))
+        else:
+            st.markdown("Fitted doubling time **{:.2f}** days{} (RMSE {:.1f} patients).".format(
+                fit.doubling_time,
+                ", distancing **{:.0%}** since day {}".format(fit.relative_contact_rate, fit.change_day)
+                if fit.change_day is not None else "",
+                fit.rmse,
+            ))
+            st.button("Use fitted values", on_click=apply_fit, args=(fit, observed))
+
+recovery_days = RECOVERY_DAYS
+metrics.record("inputs", rerun_started)
+params = derive_parameters(
+    current_hosp, doubling_time, relative_contact_rate, hosp_rate, Penn_market_share, S, initial_infections
+)
+total_infections = params.total_infections
+detection_prob = params.detection_prob
+r_t = params.r_t  # r_t is r_0 after distancing
+r_naught = params.r_naught
+doubling_time_t = params.doubling_time_t  # doubling time after distancing
 
 def head():
     st.header("Renown Health")
@@ -204,82 +302,61 @@ $$\\beta = (g + \\gamma)$$.
   - Chester = {chester}
   - Montgomery = {montgomery}
   - Bucks = {bucks}
-  - Philly = {philly}""".format(
-            delaware=delaware,
-            chester=chester,
-            montgomery=montgomery,
-            bucks=bucks,
-            philly=philly,
-        )
+  - Philly = {philly}""".format(**COUNTIES)
     )
     return None
 
 # if st.checkbox("Show more info about this tool"):
 #     show_more_info_about_this_tool()
 
-# The SIR model, one time step
-def sir(y, beta, gamma, N):
-    S, I, R = y
-    Sn = (-beta * S * I) + S
-    In = (beta * S * I - gamma * I) + I
-    Rn = gamma * I + R
-    if Sn < 0:
-        Sn = 0
-    if In < 0:
-        In = 0
-    if Rn < 0:
-        Rn = 0
-
-    scale = N / (Sn + In + Rn)
-    return Sn * scale, In * scale, Rn * scale
-
-
-# Run the SIR model forward in time
-def sim_sir(S, I, R, beta, gamma, n_days, beta_decay=None):
-    N = S + I + R
-    s, i, r = [S], [I], [R]
-    for day in range(n_days):
-        y = S, I, R
-        S, I, R = sir(y, beta, gamma, N)
-        if beta_decay:
-            beta = beta * (1 - beta_decay)
-        s.append(S)
-        i.append(I)
-        r.append(R)
-
-    s, i, r = np.array(s), np.array(i), np.array(r)
-    return s, i, r
-
-
-n_days = st.slider("Number of days to project", 30, 200, 60, 1, "%i")
+n_days = st.slider("Number of days to project", 30, 1095, keyed_default("n_days", 60), 1, "%i", key="n_days")
+engine = st.selectbox(
+    "Simulation engine", list(ENGINES), index=keyed_default("engine", 0), format_func=ENGINES.get, key="engine",
+    help="Daily steps match the original CHIME model; the Runge-Kutta engines solve the continuous SIR equations "
+    "and stay accurate at high growth rates and over multi-year horizons.",
+)
 
 beta_decay = 0.0
-s, i, r = sim_sir(S, I, R, beta, gamma, n_days, beta_decay=beta_decay)
-
-
-hosp = i * hosp_rate * Penn_market_share
-icu = i * icu_rate * Penn_market_share
-vent = i * vent_rate * Penn_market_share
-
-# Recovered
-r_hosp = r * hosp_rate * Penn_market_share
-r_icu = r * icu_rate * Penn_market_share
-r_vent = r * vent_rate * Penn_market_share
-
-
-
-days = np.array(range(0, n_days + 1))
-data_list = [days, hosp, icu, vent]
-data_dict = dict(zip(["day", "hosp", "icu", "vent"], data_list))
-
 
-r_data_list = [days, r_hosp, r_icu, r_vent]
-r_data_dict = dict(zip(["day", "hosp", "icu", "vent"], r_data_list))
 
-
-projection = pd.DataFrame.from_dict(data_dict)
-
-r_projection = pd.DataFrame.from_dict(r_data_dict)
+scenario_inputs = dict(
+    current_hosp=current_hosp, doubling_time=doubling_time, relative_contact_rate=relative_contact_rate,
+    hosp_rate=hosp_rate, icu_rate=icu_rate, vent_rate=vent_rate, hosp_los=hosp_los, icu_los=icu_los,
+    vent_los=vent_los, market_share=Penn_market_share, S=S, n_days=n_days, beta_decay=beta_decay,
+    schedule=schedule, engine=engine,
+)
+s, i, r, projection, r_projection, projection_admits, census_table = cached_projection(**scenario_inputs)
+
+
+def apply_snapshot(store, name):
+    """Seed the sidebar with a saved scenario, and the projection cache with its run; runs as a callback."""
+    snapshot = store.load(name)
+    inputs = snapshot.inputs
+    st.session_state.update(
+        {key: round(inputs[key] * 100, 10) for key in ["hosp_rate", "icu_rate", "vent_rate", "market_share"]},
+        current_hosp=inputs["current_hosp"], doubling_time=inputs["doubling_time"],
+        relative_contact_rate=int(round(inputs["relative_contact_rate"] * 100)),
+        schedule_text=", ".join("{}:{:g}".format(day, round(rate * 100, 10)) for day, rate in inputs["schedule"]),
+        hosp_los=inputs["hosp_los"], icu_los=inputs["icu_los"], vent_los=inputs["vent_los"], S=inputs["S"],
+        n_days=inputs["n_days"], engine=inputs["engine"],
+    )
+    projection_cache.put(projection_key(**inputs), snapshot.projection)
+
+
+with st.sidebar.expander("Saved scenarios"):
+    try:
+        store = ScenarioStore()
+        scenario_name = st.text_input("Scenario name", help="Saving under an existing name replaces it")
+        if st.button("Save current inputs"):
+            store.save(scenario_name, scenario_inputs)
+            st.success("Saved **{}**.".format(scenario_name.strip()))
+        saved_scenarios = store.names()
+    except (sqlite3.Error, ValueError) as e:
+        store, saved_scenarios = None, []
+        st.error(str(e))
+    if saved_scenarios:
+        loaded_name = st.selectbox("Saved scenario", saved_scenarios)
+        st.button("Load into sidebar", on_click=apply_snapshot, args=(store, loaded_name))
 
 st.subheader("New Admissions")
 st.markdown("""Projected number of **daily** COVID-19 admissions at Renown Health. 
@@ -289,36 +366,9 @@ will be at this rate.
 
 Figure 1. New admissions for COVID-19 per day by patient category""")
 
-# New cases
-projection_admits = projection.iloc[:-1, :] - projection.shift(1)
-r_projection_admits = r_projection.iloc[:-1, :] - r_projection.shift(1)
-
-projection_admits = projection_admits + r_projection_admits
-#projection_admits[projection_admits < 0] = 0
-
 plot_projection_days = n_days - 10
-projection_admits["day"] = range(projection_admits.shape[0])
-
-
-def new_admissions_chart(projection_admits: pd.DataFrame, plot_projection_days: int) -> alt.Chart:
-    """docstring"""
-    projection_admits = projection_admits.rename(columns={"hosp": "Hospitalized", "icu": "ICU", "vent": "Ventilated"})
-    return (
-        alt
-        .Chart(projection_admits.head(plot_projection_days))
-        .transform_fold(fold=["Hospitalized", "ICU", "Ventilated"])
-        .mark_line(point=True)
-        .encode(
-            x=alt.X("day", title="Days from today"),
-            y=alt.Y("value:Q", title="Daily admissions"),
-            color="key:N",
-            tooltip=["day", "key:N"]
-        )
-        .interactive()
-    )
-
 
-st.altair_chart(new_admissions_chart(projection_admits, plot_projection_days), use_container_width=True)
+show_chart(new_admissions_chart, projection_admits, plot_projection_days)
 st.markdown("""This chart presents the projected number of new admissions for COVID-19 to the health system 
 per day by patient category. Each line describes a non-overlapping group. For example, if we expect 25 new 
 patients requiring hospitalization (blue line), 10 new patients requiring intensive care (orange line), and 
@@ -332,7 +382,7 @@ if st.checkbox("Show Projected Admissions in tabular form"):
     admits_table.index = range(admits_table.shape[0])
     admits_table = admits_table.fillna(0).astype(int)
 
-    st.dataframe(admits_table)
+    show_dataframe(admits_table)
 
 st.subheader("Admitted Patients (Census)")
 st.markdown(
@@ -340,56 +390,7 @@ st.markdown(
     Figure 2. Current census of COVID-19 patients per day by patient category"""
 )
 
-def _census_table(projection_admits, hosp_los, icu_los, vent_los) -> pd.DataFrame:
-    """ALOS for each category of COVID-19 case (total guesses)"""
-
-    los_dict = {
-        "hosp": hosp_los,
-        "icu": icu_los,
-        "vent": vent_los,
-    }
-
-    census_dict = dict()
-    for k, los in los_dict.items():
-        census = (
-            projection_admits.cumsum().iloc[:-los, :]
-            - projection_admits.cumsum().shift(los).fillna(0)
-        ).apply(np.ceil)
-        census_dict[k] = census[k]
-
-
-    census_df = pd.DataFrame(census_dict)
-    census_df["day"] = census_df.index
-    census_df = census_df[["day", "hosp", "icu", "vent"]]
-
-    census_table = census_df[np.mod(census_df.index, 7) == 0].copy()
-    census_table.index = range(census_table.shape[0])
-    census_table.loc[0, :] = 0
-    census_table = census_table.dropna().astype(int)
-
-    return census_table
-
-census_table = _census_table(projection_admits, hosp_los, icu_los, vent_los)
-
-def admitted_patients_chart(census: pd.DataFrame) -> alt.Chart:
-    """docstring"""
-    census = census.rename(columns={"hosp": "Hospital Census", "icu": "ICU Census", "vent": "Ventilated Census"})
-
-    return (
-        alt
-        .Chart(census)
-        .transform_fold(fold=["Hospital Census", "ICU Census", "Ventilated Census"])
-        .mark_line(point=True)
-        .encode(
-            x=alt.X("day", title="Days from today"),
-            y=alt.Y("value:Q", title="Census"),
-            color="key:N",
-            tooltip=["day", "key:N"]
-        )
-        .interactive()
-    )
-
-st.altair_chart(admitted_patients_chart(census_table), use_container_width=True)
+show_chart(admitted_patients_chart, census_table)
 st.markdown("""This chart presents the projected total patient census for COVID-19 per day by patient category.
 As with Figure 1, each line represents a non-overlapping group. For example, if we expect to have 50 patients 
 currently requiring hospitalization(blue line), 20 patients who currently require intensive care(orange line), 
@@ -398,24 +399,142 @@ needs is 80 (50 + 20 + 10). This count does not include patients who are in the
 
 
 if st.checkbox("Show Projected Census in tabular form"):
-    st.dataframe(census_table)
-
-def additional_projections_chart(i: np.ndarray, r: np.ndarray) -> alt.Chart:
-    dat = pd.DataFrame({"Infected": i, "Recovered": r})
-
-    return (
-        alt
-        .Chart(dat.reset_index())
-        .transform_fold(fold=["Infected", "Recovered"])
-        .mark_line()
-        .encode(
-            x=alt.X("index", title="Days from today"),
-            y=alt.Y("value:Q", title="Case Volume"),
-            tooltip=["key:N", "value:Q"],
-            color="key:N"
+    show_dataframe(census_table)
+
+st.subheader("Capacity")
+capacity_labels = {"hosp": "hospital beds", "icu": "ICU beds", "vent": "ventilators"}
+capacity_use = capacity_report(daily_census(projection_admits, hosp_los, icu_los, vent_los), capacity)
+over = capacity_table(capacity_use, capacity).dropna(subset=["first_day_over"])
+if over.empty:
+    st.markdown("The projected census stays within the sidebar's capacity over the next {} days.".format(n_days))
+for row in over.itertuples():
+    st.markdown(
+        "The census needs more than the **{:,}** {} on day **{}**, and is short by up to **{:,}**, "
+        "for **{:,}** patient-days in all.".format(
+            row.capacity, capacity_labels[row.category], row.first_day_over, row.peak_shortfall,
+            row.overflow_patient_days,
+        )
+    )
+if st.checkbox("Show capacity in tabular form"):
+    show_dataframe(capacity_table(capacity_use, capacity))
+
+if st.checkbox("Show census uncertainty bands (Monte Carlo)"):
+    st.markdown("""Inputs below are sampled from the given distributions (`uniform:low,high`, `normal:mean,sd`,
+`lognormal:mean,sigma`, `triangular:left,mode,right`); all other inputs, later changes in social distancing
+included, keep their sidebar values. The shaded band runs from the 10th to the 90th percentile of the projected
+census, and the line is the median.""")
+    distributions_text = st.text_area(
+        "Input distributions (one input=distribution per line)",
+        value="\n".join([
+            "doubling_time=triangular:{:g},{:g},{:g}".format(0.75 * doubling_time, doubling_time, 1.5 * doubling_time),
+            "hosp_rate=uniform:{:g},{:g}".format(0.5 * hosp_rate, 1.5 * hosp_rate),
+            "icu_rate=uniform:{:g},{:g}".format(0.5 * icu_rate, 1.5 * icu_rate),
+            "vent_rate=uniform:{:g},{:g}".format(0.5 * vent_rate, 1.5 * vent_rate),
+            "hosp_los=normal:{},{:g}".format(hosp_los, 0.2 * hosp_los),
+            "icu_los=normal:{},{:g}".format(icu_los, 0.2 * icu_los),
+            "vent_los=normal:{},{:g}".format(vent_los, 0.2 * vent_los),
+        ]),
+    )
+    n_trajectories = st.number_input("Number of trajectories", 100, 50000, value=2000, step=500, format="%i")
+    seed = st.number_input("Random seed", value=0, step=1, format="%i")
+    try:
+        ensemble = cached_ensemble(
+            parse_distributions(distributions_text), n_trajectories, n_days, seed=seed, engine=engine,
+            capacity=tuple(capacity), schedule=tuple(schedule), workers=os.cpu_count() or 1,
+            base=dict(
+                current_hosp=current_hosp, doubling_time=doubling_time, relative_contact_rate=relative_contact_rate,
+                hosp_rate=hosp_rate, icu_rate=icu_rate, vent_rate=vent_rate, hosp_los=hosp_los, icu_los=icu_los,
+                vent_los=vent_los, market_share=Penn_market_share, S=S,
+            ),
         )
-        .interactive()
+    except ValueError as e:
+        st.error(str(e))
+    else:
+        show_chart(census_bands_chart, ensemble.bands)
+        within = st.slider("Days ahead for the chance of running out", 1, n_days - 1, min(30, n_days - 1))
+        chances = exceedance_probability(ensemble.capacity, within)
+        st.markdown("Chance of needing more than the sidebar's capacity within {} days: {}.".format(
+            within, ", ".join("{} **{:.0%}**".format(label, p) for label, p in zip(capacity_labels.values(), chances)),
+        ))
+
+if st.checkbox("Show sensitivity of the peak census to each input"):
+    st.markdown("""Each input is moved 20% down and up from its sidebar value (social distancing by 10 points), one
+at a time, and the bars show where the peak census goes; later changes in social distancing apply to every run.
+The widest bars are the inputs that matter most.""")
+    sensitivity_category = st.selectbox(
+        "Patient category", ["hosp", "icu", "vent"],
+        format_func={"hosp": "Hospitalized", "icu": "ICU", "vent": "Ventilated"}.get,
+    )
+    sensitivities = cached_sensitivity(
+        dict(
+            current_hosp=current_hosp, doubling_time=doubling_time, relative_contact_rate=relative_contact_rate,
+            hosp_rate=hosp_rate, icu_rate=icu_rate, vent_rate=vent_rate, hosp_los=hosp_los, icu_los=icu_los,
+            vent_los=vent_los, market_share=Penn_market_share, S=S,
+        ),
+        n_days, engine=engine, schedule=schedule,
+    )
+    baseline_peak = sensitivities.baseline["peak_" + sensitivity_category]
+    st.markdown("Baseline peak: **{:,.0f}** patients on day **{}**.".format(
+        baseline_peak, sensitivities.baseline["day_" + sensitivity_category]
+    ))
+    show_chart(tornado_chart, sensitivities.table, baseline_peak, sensitivity_category)
+    if st.checkbox("Show sensitivities in tabular form"):
+        show_dataframe(tornado(sensitivities, sensitivity_category))
+
+if st.checkbox("Compare social distancing schedules"):
+    st.markdown("""Each line is a schedule of `day:%` changes in social distancing, starting from the sidebar's
+social distancing today; all other inputs keep their sidebar values.""")
+    schedules_text = st.text_area(
+        "Schedules (one per line)", value="\n".join([schedule_text or "14:30", "14:30, 45:10", "7:50, 60:20"]),
     )
+    try:
+        schedules = [parse_schedule(line) for line in schedules_text.splitlines() if line.strip()]
+    except ValueError as e:
+        st.error(str(e))
+    else:
+        if schedules:
+            compared = build_projection_batch(
+                current_hosp, doubling_time, relative_contact_rate, hosp_rate, icu_rate, vent_rate,
+                hosp_los, icu_los, vent_los, Penn_market_share, S, n_days,
+                contact_rates=contact_schedules(schedules, n_days, initial=relative_contact_rate), engine=engine,
+            )
+            labels = [", ".join("{}:{:.0%}".format(d, c) for d, c in sched) or "none" for sched in schedules]
+            show_chart(schedule_comparison_chart, compared.census, labels)
+
+if saved_scenarios and st.checkbox("Compare saved scenarios"):
+    st.markdown("""Saved scenarios are read back from the scenario store without running the model again. The table
+lists the inputs that differ between them, and each one's peak census and day of peak.""")
+    compared_names = st.multiselect("Scenarios", saved_scenarios, default=saved_scenarios[:2])
+    if compared_names:
+        snapshots = [store.load(name) for name in compared_names]
+        show_chart(schedule_comparison_chart, stack_census(snapshots), compared_names, "Saved scenario")
+        show_dataframe(diff(snapshots).astype(str))
+
+if st.checkbox("Show multi-facility projections"):
+    st.markdown("""Each county below runs its own epidemic curve from its population, and its infections are split
+between facilities by the county's market share at each one. Today's hospitalized patients are spread over the
+counties by population; all other inputs, later changes in social distancing included, keep their sidebar
+values.""")
+    regions_text = st.text_area(
+        "Counties and facility market shares (CSV: county, population, then one share per facility)",
+        value="county,population,Hospital\n" + "\n".join(
+            "{},{},{:g}".format(county, population, Penn_market_share) for county, population in COUNTIES.items()
+        ),
+    )
+    try:
+        regional = cached_regional_projection(
+            parse_regions(regions_text), current_hosp=current_hosp, doubling_time=doubling_time,
+            relative_contact_rate=relative_contact_rate, hosp_rate=hosp_rate, icu_rate=icu_rate, vent_rate=vent_rate,
+            hosp_los=hosp_los, icu_los=icu_los, vent_los=vent_los, n_days=n_days, schedule=tuple(schedule),
+            engine=engine,
+        )
+    except ValueError as e:
+        st.error(str(e))
+    else:
+        regional_census = regional_census_frame(regional)
+        show_chart(facility_census_chart, regional_census)
+        if st.checkbox("Show facility census in tabular form"):
+            show_dataframe(regional_census[regional_census["day"] % 7 == 0].reset_index(drop=True))
 
 # st.markdown(
 #     """**Click the checkbox below to view additional data generated by this simulation**"""
@@ -428,7 +547,7 @@ def show_additional_projections():
     st.markdown("Figure 3. Current number of infected and recovered individuals in the population.")
 
 
-    st.altair_chart(additional_projections_chart(i, r), use_container_width=True)
+    show_chart(additional_projections_chart, i, r)
 
     st.markdown("""This chart presents the projected number of people in the population who are 
     currently infected with COVID-19 and the total number of people currently recovered from the virus.""")
@@ -442,7 +561,7 @@ def show_additional_projections():
         infect_table = (projection_area.iloc[::7, :]).apply(np.floor)
         infect_table.index = range(infect_table.shape[0])
 
-        st.dataframe(infect_table)
+        show_dataframe(infect_table)
     
 
 # if st.checkbox("Show Additional Projections"):
@@ -476,3 +595,6 @@ st.markdown(
     """
 )
 st.markdown("© 2020, The Trustees of the University of Pennsylvania")
+
+metrics.chart_payload(chart_payload_bytes)
+metrics.record("rerun", rerun_started)
@@ -0,0 +1,142 @@
+"""Micro and macro benchmarks for the projection pipeline.
+
+    python -m benchmarks.bench                      # run and compare to the baseline
+    python -m benchmarks.bench --output results.json
+    python -m benchmarks.bench --save-baseline      # after an intended change
+
+Each case is timed with timeit; the best of several repeats is reported in
+seconds per call. A case is a regression when it is slower than the stored
+baseline by more than ``--tolerance``, and then the exit status is 1; so is
+a case missing from the baseline, which needs ``--save-baseline`` first.
+Baselines are machine specific, so regenerate them on the machine that runs
+the comparison.
+"""
+
+from typing import Callable, Dict
+import argparse
+import json
+import os
+import platform
+import sys
+import timeit
+
+import numpy as np
+import pandas as pd
+
+from renown_chime.charts import admitted_patients_chart, chart_spec, new_admissions_chart
+from renown_chime.models import sir, sim_sir, sim_sir_batch
+from renown_chime.ode import get_ode_beta, sim_sir_ode
+from renown_chime.parameters import DEFAULTS
+from renown_chime.projections import (
+    build_admissions, build_census_table, build_projection, build_projection_batch, projection_key,
+)
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+
+def cases() -> Dict[str, Callable[[], object]]:
+    """Benchmark name -> zero-argument callable, all on the sidebar defaults."""
+    inputs = dict(DEFAULTS, n_days=200)
+    projection = build_projection(*projection_key(**inputs))
+    S, I, gamma = DEFAULTS["S"], projection.i[0], 1 / 14.0
+    beta = (2 ** (1 / DEFAULTS["doubling_time"]) - 1 + gamma) / S
+    ode_beta = get_ode_beta(DEFAULTS["doubling_time"], 0.0, S, gamma)
+    rates = DEFAULTS["hosp_rate"], DEFAULTS["icu_rate"], DEFAULTS["vent_rate"], DEFAULTS["market_share"]
+    los = DEFAULTS["hosp_los"], DEFAULTS["icu_los"], DEFAULTS["vent_los"]
+    batch = {k: np.full(1000, v, dtype=float) for k, v in inputs.items() if k != "n_days"}
+    batch["doubling_time"] = np.linspace(3, 10, 1000)
+
+    return {
+        "sir": lambda: sir((S, I, 0), beta, gamma, S + I),
+        "sim_sir_30": lambda: sim_sir(S, I, 0, beta, gamma, 30),
+        "sim_sir_200": lambda: sim_sir(S, I, 0, beta, gamma, 200),
+        "sim_sir_2000": lambda: sim_sir(S, I, 0, beta, gamma, 2000),
+        "sim_sir_ode_rk4_1095": lambda: sim_sir_ode(S, I, 0, ode_beta, gamma, 1095, method="rk4"),
+        "sim_sir_ode_rk45_1095": lambda: sim_sir_ode(S, I, 0, ode_beta, gamma, 1095, method="rk45"),
+        "sim_sir_batch_1000x200": lambda: sim_sir_batch(S, I, 0, np.full(1000, beta), gamma, 200),
+        "projection_admits": lambda: build_admissions(projection.i, projection.r, *rates),
+        "census_table": lambda: build_census_table(projection.projection_admits, *los),
+        "build_projection": lambda: build_projection(*projection_key(**inputs)),
+        "build_projection_batch_1000": lambda: build_projection_batch(**batch, n_days=200),
+        "new_admissions_chart": lambda: new_admissions_chart(projection.projection_admits, 190).to_dict(),
+        "admitted_patients_chart": lambda: admitted_patients_chart(projection.census_table).to_dict(),
+        "new_admissions_spec_cached": lambda: chart_spec(new_admissions_chart, projection.projection_admits, 190),
+    }
+
+
+def measure(func: Callable[[], object], repeat: int = 5) -> Dict[str, float]:
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()  # enough loops for at least 0.2s
+    times = np.array(timer.repeat(repeat=repeat, number=number)) / number
+    return {"seconds": float(times.min()), "median": float(np.median(times)), "loops": number}
+
+
+def run(selected=None, repeat: int = 5) -> dict:
+    results = {}
+    for name, func in cases().items():
+        if selected and name not in selected:
+            continue
+        results[name] = measure(func, repeat=repeat)
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "machine": platform.machine(),
+            "processor": platform.processor(),
+        },
+        "results": results,
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> Dict[str, dict]:
+    """Ratio of current to baseline time per case; regressed when over tolerance.
+
+    Cases the baseline lacks are reported as missing, with no ratio.
+    """
+    report = {}
+    for name, current in results["results"].items():
+        if name not in baseline.get("results", {}):
+            report[name] = {"ratio": None, "regressed": False, "missing": True}
+            continue
+        ratio = current["seconds"] / baseline["results"][name]["seconds"]
+        report[name] = {"ratio": ratio, "regressed": ratio > tolerance, "missing": False}
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench", description=__doc__.split("\n\n")[0])
+    parser.add_argument("cases", nargs="*", help="only run these cases")
+    parser.add_argument("--baseline", default=BASELINE, help="baseline results to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--output", help="also write the results as JSON to this file")
+    parser.add_argument("--tolerance", type=float, default=1.5, help="allowed slowdown ratio")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    results = run(args.cases, repeat=args.repeat)
+    baseline = {}
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    report = compare(results, baseline, args.tolerance) if baseline else {}
+
+    for name, current in results["results"].items():
+        line = "{:<30} {:>12.3f} us".format(name, current["seconds"] * 1e6)
+        if name in report and report[name]["missing"]:
+            line += "  NO BASELINE"
+        elif name in report:
+            line += "  {:>6.2f}x{}".format(report[name]["ratio"], "  REGRESSION" if report[name]["regressed"] else "")
+        print(line)
+
+    for path in filter(None, [args.output, args.baseline if args.save_baseline else None]):
+        with open(path, "w") as f:
+            json.dump(dict(results, comparison=report) if path == args.output else results, f, indent=2)
+            f.write("\n")
+
+    if any(r["regressed"] or r["missing"] for r in report.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
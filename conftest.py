@@ -0,0 +1,12 @@
+import pytest
+
+from renown_chime.parameters import DEFAULTS
+from renown_chime.projections import projection_key
+
+
+@pytest.fixture
+def default_key():
+    """projection_key of the sidebar defaults, with any inputs overridden."""
+    def key(**inputs):
+        return projection_key(**dict(DEFAULTS, **inputs))
+    return key
@@ -0,0 +1,22 @@
+"""Side-effect-free CHIME model core.
+
+Importing this package pulls in numpy and pandas only; the streamlit page
+lives in ``app.py`` and the altair charts in ``renown_chime.charts``.
+"""
+
+from .cache import LRUCache
+from .census import census_from_admits, los_distribution
+from .models import sir, sim_sir, sim_sir_batch
+from .parameters import DEFAULTS, RECOVERY_DAYS, Parameters, derive_parameters, get_beta
+from .projections import (
+    BatchProjection,
+    Projection,
+    build_admissions,
+    build_census_table,
+    build_projection,
+    build_projection_batch,
+    cached_projection,
+    projection_cache,
+    projection_key,
+)
+from .schedules import contact_schedule, contact_schedules, parse_schedule
@@ -0,0 +1,228 @@
+"""Stateless JSON/HTTP projection API.
+
+    python -m renown_chime.api --port 8080
+
+``POST /projection`` takes the sidebar inputs as a JSON object, with
+percentages as fractions and sidebar defaults for anything left out, and
+returns the daily admissions and the weekly census table::
+
+    curl -d '{"doubling_time": 4, "relative_contact_rate": 0.3}' localhost:8080/projection
+
+Later changes in social distancing go in ``schedule`` as ``[day, rate]``
+pairs, and ``engine`` picks one of ode.ENGINES::
+
+    curl -d '{"schedule": [[14, 0.3], [45, 0.1]], "engine": "rk4"}' localhost:8080/projection
+
+Simulations run on a bounded process pool so the event loop keeps serving
+while they compute. Responses are cached on the normalized inputs, and
+concurrent requests for the same inputs share one computation.
+"""
+
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Dict, Optional
+import argparse
+import asyncio
+import contextlib
+import json
+import math
+import os
+
+from . import metrics
+from .cache import LRUCache
+from .ode import ENGINES
+from .parameters import DEFAULTS, derive_parameters
+from .projections import CATEGORIES, build_projection, projection_key
+
+MAX_DAYS = 2000
+
+# name -> (type, lowest, highest) accepted
+INPUTS = {
+    "current_hosp": (int, 0, None),
+    "doubling_time": (float, 0.1, None),
+    "relative_contact_rate": (float, 0.0, 0.99),
+    "hosp_rate": (float, 1e-6, 1.0),
+    "icu_rate": (float, 0.0, 1.0),
+    "vent_rate": (float, 0.0, 1.0),
+    "hosp_los": (int, 1, None),
+    "icu_los": (int, 1, None),
+    "vent_los": (int, 1, None),
+    "market_share": (float, 1e-6, 1.0),
+    "S": (int, 1, None),
+    "n_days": (int, 1, MAX_DAYS),
+}
+OPTIONS = ("schedule", "engine")  # validated separately, see parse_schedule
+
+
+def _is_number(value) -> bool:
+    return not isinstance(value, bool) and isinstance(value, (int, float)) and math.isfinite(value)
+
+
+def parse_schedule(value) -> tuple:
+    """``[[day, rate], ...]`` as sorted ``(day, rate)`` pairs; raises ValueError."""
+    if not isinstance(value, list):
+        raise ValueError("schedule must be a list of [day, rate] pairs")
+    segments = []
+    for segment in value:
+        if not isinstance(segment, list) or len(segment) != 2 or not all(map(_is_number, segment)):
+            raise ValueError("schedule must be a list of [day, rate] pairs")
+        day, rate = segment
+        if day != int(day) or day < 0:
+            raise ValueError("schedule days must be whole numbers from 0")
+        if not 0 <= rate < 1:
+            raise ValueError("schedule rates must be at least 0 and below 1")
+        segments.append((int(day), float(rate)))
+    return tuple(sorted(segments))
+
+
+def parse_inputs(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Validated model inputs from a request body; raises ValueError."""
+    if not isinstance(payload, dict):
+        raise ValueError("expected a JSON object")
+    unknown = set(payload) - set(INPUTS) - set(OPTIONS)
+    if unknown:
+        raise ValueError("unknown inputs: {}".format(", ".join(sorted(unknown))))
+
+    inputs = {}
+    for name, (kind, low, high) in INPUTS.items():
+        value = payload.get(name, DEFAULTS[name])
+        if not _is_number(value):
+            raise ValueError("{} must be a number".format(name))
+        if kind is int and value != int(value):
+            raise ValueError("{} must be a whole number".format(name))
+        if value < low:
+            raise ValueError("{} must be at least {}".format(name, low))
+        if high is not None and value > high:
+            raise ValueError("{} must be at most {}".format(name, high))
+        inputs[name] = kind(value)
+
+    inputs["schedule"] = parse_schedule(payload.get("schedule", []))
+    inputs["engine"] = payload.get("engine", "euler")
+    if inputs["engine"] not in ENGINES:
+        raise ValueError("engine must be one of {}".format(", ".join(ENGINES)))
+    return inputs
+
+
+def _series(frame) -> Dict[str, list]:
+    return {
+        column: [None if isinstance(x, float) and math.isnan(x) else x for x in frame[column].tolist()]
+        for column in frame.columns
+    }
+
+
+def projection_body(key: tuple) -> bytes:
+    """JSON response for a projection_key; runs in a worker process."""
+    projection = build_projection(*key)
+    inputs = dict(zip(INPUTS, key), schedule=key[-2], engine=key[-1])
+    params = derive_parameters(
+        inputs["current_hosp"], inputs["doubling_time"], inputs["relative_contact_rate"],
+        inputs["hosp_rate"], inputs["market_share"], inputs["S"],
+    )
+    body = {
+        "inputs": inputs,
+        "parameters": {
+            "total_infections": params.total_infections,
+            "beta": params.beta,
+            "r_t": params.r_t,
+            "r_naught": params.r_naught,
+            "doubling_time_t": params.doubling_time_t,
+        },
+        "admissions": _series(projection.projection_admits[["day"] + CATEGORIES]),
+        "census": _series(projection.census_table),
+    }
+    return json.dumps(body, separators=(",", ":")).encode()
+
+
+class ProjectionService:
+    """Runs projections on a bounded pool and caches the encoded responses."""
+
+    def __init__(self, executor: Executor, max_pending: int = 64, cache_size: int = 1024):
+        self.executor = executor
+        self.cache = LRUCache(maxsize=cache_size)
+        self._slots = asyncio.Semaphore(max_pending)
+        self._inflight: Dict[tuple, asyncio.Task] = {}
+
+    async def projection(self, inputs: Dict[str, Any]) -> bytes:
+        key = projection_key(**inputs)
+        body = self.cache.lookup(key)
+        if body is not None:
+            return body
+        task = self._inflight.get(key)
+        if task is None:
+            # a task of its own, so a caller that disconnects doesn't cancel it for the others
+            task = asyncio.ensure_future(self._compute(key))
+            task.add_done_callback(lambda done: self._forget(key, done))
+            self._inflight[key] = task
+        return await asyncio.shield(task)
+
+    async def _compute(self, key: tuple) -> bytes:
+        async with self._slots:
+            body = await asyncio.get_running_loop().run_in_executor(self.executor, projection_body, key)
+        self.cache.put(key, body)
+        return body
+
+    def _forget(self, key: tuple, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # mark it retrieved; callers still waiting re-raise it themselves
+
+
+def create_app(service: Optional[ProjectionService] = None, workers: Optional[int] = None):
+    from starlette.applications import Starlette
+    from starlette.responses import JSONResponse, Response
+    from starlette.routing import Route
+
+    state = {"service": service}
+
+    def get_service() -> ProjectionService:
+        if state["service"] is None:
+            pool = ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1)
+            state["service"] = ProjectionService(pool)
+            metrics.register_cache("api_response", state["service"].cache)
+        return state["service"]
+
+    async def projection(request):
+        try:
+            inputs = parse_inputs(await request.json())
+        except ValueError as e:  # includes malformed JSON
+            return JSONResponse({"error": str(e)}, status_code=400)
+        body = await get_service().projection(inputs)
+        return Response(body, media_type="application/json")
+
+    async def metrics_text(request):
+        return Response(metrics.render(), media_type="text/plain; version=0.0.4")
+
+    async def healthz(request):
+        cache = get_service().cache
+        return JSONResponse({"status": "ok", "cache": {"size": len(cache), "hit_ratio": cache.hit_ratio}})
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app):
+        yield
+        if state["service"] is not None and service is None:
+            state["service"].executor.shutdown()
+
+    return Starlette(
+        routes=[
+            Route("/projection", projection, methods=["POST"]),
+            Route("/healthz", healthz),
+            Route("/metrics", metrics_text),
+        ],
+        lifespan=lifespan,
+    )
+
+
+def main(argv=None):
+    import uvicorn
+
+    parser = argparse.ArgumentParser(prog="python -m renown_chime.api", description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", 8080)))
+    parser.add_argument("--workers", type=int, help="simulation processes (default: one per core)")
+    args = parser.parse_args(argv)
+
+    uvicorn.run(create_app(workers=args.workers), host=args.host, port=args.port, log_level="info")
+
+
+if __name__ == "__main__":
+    main()
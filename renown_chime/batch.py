@@ -0,0 +1,263 @@
+"""Headless batch projections over a grid of scenarios.
+
+Runs the SIR, admissions and census pipeline for every row of a scenario
+grid and streams the daily results to CSV or Parquet, chunk by chunk, so
+memory stays flat however large the grid is::
+
+    python -m renown_chime.batch out.csv --grid doubling_time=3:10:1 \\
+        --grid relative_contact_rate=0,0.25,0.5 --n-days 120
+
+    python -m renown_chime.batch out.parquet --scenarios regions.csv
+
+Ranges are ``start:stop:step`` with ``stop`` included. Parameters missing
+from the grid or the scenarios file take the sidebar defaults.
+"""
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Sequence
+import argparse
+import itertools
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from .parameters import DEFAULTS
+from .projections import CATEGORIES, build_projection_batch
+
+PARAMETERS = [name for name in DEFAULTS if name != "n_days"]
+COLUMNS = (
+    ["scenario", "day"] + PARAMETERS
+    + ["admits_" + c for c in CATEGORIES] + ["census_" + c for c in CATEGORIES]
+)
+WHOLE = ["hosp_los", "icu_los", "vent_los"]  # whole days in batch_census
+DTYPES = {name: np.int64 if name in ("scenario", "day") else np.float64 for name in COLUMNS}
+
+
+def parse_values(spec: str) -> List[float]:
+    """``a,b,c`` or an inclusive ``start:stop:step`` range."""
+    if ":" in spec:
+        start, stop, step = (float(x) for x in spec.split(":"))
+        if step <= 0:
+            raise ValueError("range step must be positive: {}".format(spec))
+        return list(np.round(np.arange(start, stop + step / 2, step), 10))
+    return [float(x) for x in spec.split(",")]
+
+
+def parse_grid(specs: Sequence[str]) -> Dict[str, List[float]]:
+    grid = {}
+    for spec in specs:
+        name, _, values = spec.partition("=")
+        if name not in PARAMETERS:
+            raise ValueError("unknown parameter {!r}, expected one of {}".format(name, ", ".join(PARAMETERS)))
+        grid[name] = check_values(name, parse_values(values))
+    return grid
+
+
+def check_values(name: str, values):
+    """Reject values the batch pipeline can't use as given, e.g. a LOS of 10.5 days."""
+    array = np.asarray(values, dtype=float)
+    if name in WHOLE and (array != np.round(array)).any():
+        raise ValueError("{} must be a whole number of days, got {}".format(
+            name, ", ".join("{:g}".format(x) for x in array[array != np.round(array)])
+        ))
+    return values
+
+
+def grid_size(grid: Dict[str, List[float]]) -> int:
+    return int(np.prod([len(v) for v in grid.values()], dtype=np.int64))
+
+
+def grid_chunks(grid: Dict[str, List[float]], chunk_size: int) -> Iterator[pd.DataFrame]:
+    """Cartesian product of the grid, without ever materializing all of it."""
+    names = list(grid)
+    rows = itertools.product(*(grid[name] for name in names))
+    while True:
+        chunk = list(itertools.islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield pd.DataFrame(chunk, columns=names)
+
+
+def check_scenarios(path: str, chunk_size: int) -> int:
+    """Validate every row of a scenarios CSV, chunk by chunk; returns the number of rows.
+
+    Run before the output is opened, so a bad row near the end of the file
+    can't leave a truncated output behind.
+    """
+    rows = 0
+    for chunk in pd.read_csv(path, chunksize=chunk_size):
+        unknown = set(chunk.columns) - set(PARAMETERS)
+        if unknown:
+            raise ValueError("unknown scenario columns: {}".format(", ".join(sorted(unknown))))
+        for name in chunk.columns:
+            if not pd.api.types.is_numeric_dtype(chunk[name]) or chunk[name].isna().any():
+                raise ValueError("scenario column {} must hold a number on every row".format(name))
+            check_values(name, chunk[name])
+        rows += len(chunk)
+    return rows
+
+
+def csv_chunks(path: str, chunk_size: int) -> Iterator[pd.DataFrame]:
+    """Scenario rows, chunk by chunk, as validated by check_scenarios."""
+    yield from pd.read_csv(path, chunksize=chunk_size)
+
+
+def run_chunk(scenarios: pd.DataFrame, n_days: int, first_id: int) -> pd.DataFrame:
+    """Project one chunk of scenarios into long-format daily rows."""
+    params = {name: scenarios[name].to_numpy() if name in scenarios else DEFAULTS[name] for name in PARAMETERS}
+    result = build_projection_batch(**params, n_days=n_days)
+
+    n_scenarios, n_rows = len(scenarios), n_days + 1
+    out = {
+        "scenario": np.repeat(np.arange(first_id, first_id + n_scenarios), n_rows),
+        "day": np.tile(np.arange(n_rows), n_scenarios),
+    }
+    for name in PARAMETERS:
+        out[name] = np.repeat(np.broadcast_to(params[name], (n_scenarios,)), n_rows)
+    for k, category in enumerate(CATEGORIES):
+        out["admits_" + category] = result.admits[:, :, k].ravel()
+    for k, category in enumerate(CATEGORIES):
+        out["census_" + category] = result.census[:, :, k].ravel()
+    # fixed dtypes, so every chunk has the same Parquet schema whatever values it holds
+    return pd.DataFrame(out, columns=COLUMNS).astype(DTYPES)
+
+
+def encode_csv(frame: pd.DataFrame) -> str:
+    return frame.to_csv(header=False, index=False)
+
+
+def project_chunk(scenarios: pd.DataFrame, n_days: int, first_id: int, encode=None):
+    """run_chunk plus, optionally, serialization, so workers share that cost too."""
+    frame = run_chunk(scenarios, n_days, first_id)
+    return len(scenarios), frame if encode is None else encode(frame)
+
+
+class CSVSink:
+    encode = staticmethod(encode_csv)
+
+    def __init__(self, path: str):
+        self.file = open(path, "w", newline="")
+        self.file.write(",".join(COLUMNS) + "\n")
+
+    def write(self, text: str):
+        self.file.write(text)
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetSink:
+    encode = None
+
+    def __init__(self, path: str):
+        try:
+            import pyarrow  # noqa: F401
+            import pyarrow.parquet  # noqa: F401
+        except ImportError:
+            raise SystemExit("Parquet output needs pyarrow: pip install pyarrow")
+        self.path = path
+        self.writer = None
+
+    def write(self, frame: pd.DataFrame):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        if self.writer is None:
+            self.writer = pq.ParquetWriter(self.path, table.schema)
+        self.writer.write_table(table)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+def open_sink(path: str, fmt: Optional[str] = None):
+    fmt = fmt or ("parquet" if path.endswith((".parquet", ".pq")) else "csv")
+    return ParquetSink(path) if fmt == "parquet" else CSVSink(path)
+
+
+def run(chunks: Iterator[pd.DataFrame], sink, n_days: int, workers: int = 1,
+        total: Optional[int] = None, progress=sys.stderr) -> int:
+    """Project every chunk and write the results to sink in scenario order.
+
+    At most ``2 * workers`` chunks are in flight at once. Returns the number
+    of scenarios run.
+    """
+    done = 0
+    started = time.perf_counter()
+
+    def report(result):
+        nonlocal done
+        n_scenarios, payload = result
+        sink.write(payload)
+        done += n_scenarios
+        if progress is not None:
+            rate = done / max(time.perf_counter() - started, 1e-9)
+            of = "/{}".format(total) if total else ""
+            progress.write("\r{}{} scenarios, {:,.0f} scenarios/s".format(done, of, rate))
+            progress.flush()
+
+    first_id = 0
+    if workers <= 1:
+        for chunk in chunks:
+            report(project_chunk(chunk, n_days, first_id, sink.encode))
+            first_id += len(chunk)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = deque()
+            for chunk in chunks:
+                pending.append(pool.submit(project_chunk, chunk, n_days, first_id, sink.encode))
+                first_id += len(chunk)
+                if len(pending) >= 2 * workers:
+                    report(pending.popleft().result())
+            while pending:
+                report(pending.popleft().result())
+
+    if progress is not None:
+        progress.write("\n")
+    return done
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m renown_chime.batch",
+        description=__doc__.split("\n\n")[0],
+        epilog="Parameters: " + ", ".join(PARAMETERS),
+    )
+    parser.add_argument("output", help="output file, .csv or .parquet")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--grid", action="append", metavar="NAME=VALUES",
+                        help="grid axis, e.g. doubling_time=3:10:1 or hosp_los=5,7,9 (repeatable)")
+    source.add_argument("--scenarios", metavar="CSV", help="CSV with one scenario per row")
+    parser.add_argument("--n-days", type=int, default=DEFAULTS["n_days"], help="days to project")
+    parser.add_argument("--format", choices=["csv", "parquet"], help="output format (default: from suffix)")
+    parser.add_argument("--chunk-size", type=int, default=500, help="scenarios per chunk")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="worker processes")
+    parser.add_argument("--quiet", action="store_true", help="don't report progress")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.grid:
+            grid = parse_grid(args.grid)
+            chunks, total = grid_chunks(grid, args.chunk_size), grid_size(grid)
+        else:
+            total = check_scenarios(args.scenarios, args.chunk_size)
+            chunks = csv_chunks(args.scenarios, args.chunk_size)
+
+        sink = open_sink(args.output, args.format)
+        try:
+            run(chunks, sink, args.n_days, workers=args.workers, total=total,
+                progress=None if args.quiet else sys.stderr)
+        finally:
+            sink.close()
+    except ValueError as e:  # bad grid values or scenario rows
+        parser.error(str(e))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""Bounded in-process caches."""
+
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+import threading
+
+
+class LRUCache:
+    """Bounded LRU cache with hit/miss counters.
+
+    Safe to share between threads, e.g. streamlit sessions.
+    """
+
+    def __init__(self, maxsize: int = 128):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def lookup(self, key: Hashable, default: Any = None) -> Any:
+        """Cached value for key, or default; counts as a hit or a miss."""
+        with self._lock:
+            if key in self._data:
+                self.hits += 1
+                self._data.move_to_end(key)
+                return self._data[key]
+            self.misses += 1
+            return default
+
+    def put(self, key: Hashable, value: Any):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        missing = object()
+        value = self.lookup(key, missing)
+        if value is missing:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
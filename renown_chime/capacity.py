@@ -0,0 +1,63 @@
+"""Census against bed, ICU bed and ventilator capacity.
+
+Reduces a daily census of any number of scenarios to when and by how much
+each category runs out, in whole-array operations::
+
+    result = build_projection_batch(**inputs, n_days=120)
+    report = capacity_report(result.census, [400, 80, 40])
+    report.first_exceeded  # (scenarios, categories) day, -1 if capacity holds
+    exceedance_probability(report, within=30)  # share of scenarios, per category
+
+Days without a census (NaN) never count as over capacity.
+"""
+
+from typing import NamedTuple, Sequence
+
+import numpy as np
+import pandas as pd
+
+from .projections import CATEGORIES
+
+# sidebar defaults
+CAPACITY = {"hosp": 400, "icu": 80, "vent": 40}
+
+
+class CapacityReport(NamedTuple):
+    first_exceeded: np.ndarray  # (..., categories) first day census > capacity, -1 if never
+    overflow_days: np.ndarray  # (..., categories) patient-days above capacity
+    peak_shortfall: np.ndarray  # (..., categories) most patients above capacity on any day
+
+
+def capacity_report(census, capacity: Sequence[float]) -> CapacityReport:
+    """Reduce a (..., n_days, categories) census over its days.
+
+    ``capacity`` has one entry per category, or one row per scenario.
+    """
+    census = np.asarray(census, dtype=float)
+    capacity = np.asarray(capacity, dtype=float)
+    if capacity.shape[-1] != census.shape[-1]:
+        raise ValueError("need one capacity per census category")
+
+    excess = census - capacity[..., None, :]
+    over = excess > 0  # False for NaN
+    overflow = np.where(over, excess, 0.0)
+    first = np.where(over.any(axis=-2), over.argmax(axis=-2), -1)
+    return CapacityReport(first, overflow.sum(axis=-2), overflow.max(axis=-2))
+
+
+def exceedance_probability(report: CapacityReport, within: int) -> np.ndarray:
+    """Share of scenarios over capacity on or before day ``within``, per category."""
+    first = report.first_exceeded
+    return ((first >= 0) & (first <= within)).mean(axis=0)
+
+
+def capacity_table(report: CapacityReport, capacity: Sequence[float]) -> pd.DataFrame:
+    """One scenario's report, one row per category; no first day where capacity holds."""
+    first = report.first_exceeded
+    return pd.DataFrame({
+        "category": CATEGORIES,
+        "capacity": np.asarray(capacity, dtype=np.int64),
+        "first_day_over": pd.Series(first, dtype="Int64").mask(first < 0),
+        "overflow_patient_days": report.overflow_days.astype(np.int64),
+        "peak_shortfall": report.peak_shortfall.astype(np.int64),
+    })
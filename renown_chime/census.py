@@ -0,0 +1,62 @@
+"""Census from daily admissions, computed on plain NumPy arrays."""
+
+from typing import Sequence, Union
+
+import numpy as np
+
+# an integer length of stay, or P(LOS = d days) for d = 0, 1, 2, ...
+LOS = Union[int, Sequence[float], np.ndarray]
+
+
+def los_distribution(los: LOS) -> np.ndarray:
+    """Length-of-stay probability mass function, indexed by days."""
+    if np.ndim(los) == 0:
+        pmf = np.zeros(int(los) + 1)
+        pmf[int(los)] = 1.0
+        return pmf
+    pmf = np.asarray(los, dtype=float)
+    if pmf.ndim != 1 or (pmf < 0).any() or pmf.sum() <= 0:
+        raise ValueError("LOS distribution must be a 1-d array of non-negative weights")
+    pmf = pmf / pmf.sum()
+    return pmf[: np.flatnonzero(pmf)[-1] + 1]  # drop trailing zero days
+
+
+def census_from_admits(admits: np.ndarray, los: Sequence[LOS]) -> np.ndarray:
+    """Daily census for every patient category in one pass.
+
+    ``admits`` has shape (..., n_days, categories), with NaN read as no
+    admissions, and ``los`` holds one length of stay per category. A patient
+    admitted on day t - d is still in on day t when their stay is longer
+    than d, so with C the cumulative admissions
+
+        census[t] = C[t] - sum_d P(LOS = d) * C[t - d]
+
+    which for a fixed LOS is the sliding window C[t] - C[t - los]. Every
+    category shares the one cumulative sum.
+    """
+    admits = np.asarray(admits, dtype=float)
+    if admits.shape[-1] != len(los):
+        raise ValueError("need one LOS per admissions category")
+
+    pmfs = [los_distribution(x) for x in los]
+    span = max(len(p) for p in pmfs) - 1
+    weights = np.zeros((span + 1, len(pmfs)))
+    for k, pmf in enumerate(pmfs):
+        weights[: len(pmf), k] = pmf
+
+    n_days = admits.shape[-2]
+    cumulative = np.nancumsum(admits, axis=-2)
+    # C[t - d] for t - d < 0 is zero
+    padded = np.concatenate(
+        [np.zeros(admits.shape[:-2] + (span, admits.shape[-1])), cumulative], axis=-2
+    )
+
+    discharged = np.zeros_like(cumulative)
+    for d in np.flatnonzero(weights.any(axis=1)):
+        discharged += weights[d] * padded[..., span - d: span - d + n_days, :]
+    return cumulative - discharged
+
+
+def los_span(los: LOS) -> int:
+    """Longest stay, in days, with any probability mass."""
+    return len(los_distribution(los)) - 1
@@ -0,0 +1,219 @@
+"""Altair charts for the streamlit page.
+
+Chart data is folded into long format (``day``, ``key``, ``value``) here
+rather than with a Vega-Lite ``transform_fold``, and every series longer
+than MAX_POINTS is thinned to the lowest and highest value of each stretch
+of days, so the spec stays small on long horizons and keeps the peaks.
+chart_spec memoizes the finished spec on a digest of the chart's data.
+"""
+
+from typing import Callable, NamedTuple, Sequence
+import hashlib
+import json
+
+import altair as alt
+import numpy as np
+import pandas as pd
+
+from . import metrics
+from .cache import LRUCache
+
+MAX_POINTS = 120  # per series
+
+
+def peak_indices(y: np.ndarray, max_points: int = MAX_POINTS) -> np.ndarray:
+    """Indices of at most max_points values of y.
+
+    The first and last values are kept, plus the lowest and highest value of
+    each of (max_points - 2) // 2 equal stretches in between.
+    """
+    n = len(y)
+    if n <= max_points:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, (max_points - 2) // 2 + 1).astype(int)
+    keep = [0, n - 1]
+    for low, high in zip(edges[:-1], edges[1:]):
+        if high > low:
+            stretch = y[low:high]
+            keep += [low + int(np.argmin(stretch)), low + int(np.argmax(stretch))]
+    return np.unique(keep)
+
+
+def long_format(frame: pd.DataFrame, columns: Sequence[str], x: str = "day",
+                max_points: int = MAX_POINTS, decimals: int = 2) -> pd.DataFrame:
+    """Fold columns into (x, key, value) rows, dropping NaN and thinning long series."""
+    parts = []
+    for column in columns:
+        series = frame[[x, column]].dropna()
+        values = series[column].to_numpy(dtype=float)
+        keep = peak_indices(values, max_points)
+        parts.append(pd.DataFrame({x: series[x].to_numpy()[keep], "key": column, "value": values[keep].round(decimals)}))
+    return pd.concat(parts, ignore_index=True)
+
+
+def new_admissions_chart(projection_admits: pd.DataFrame, plot_projection_days: int) -> alt.Chart:
+    """docstring"""
+    projection_admits = projection_admits.rename(columns={"hosp": "Hospitalized", "icu": "ICU", "vent": "Ventilated"})
+    data = long_format(projection_admits.head(plot_projection_days), ["Hospitalized", "ICU", "Ventilated"])
+    return (
+        alt
+        .Chart(data)
+        .mark_line(point=True)
+        .encode(
+            x=alt.X("day", title="Days from today"),
+            y=alt.Y("value:Q", title="Daily admissions"),
+            color="key:N",
+            tooltip=["day", "key:N"]
+        )
+        .interactive()
+    )
+
+
+def admitted_patients_chart(census: pd.DataFrame) -> alt.Chart:
+    """docstring"""
+    census = census.rename(columns={"hosp": "Hospital Census", "icu": "ICU Census", "vent": "Ventilated Census"})
+
+    data = long_format(census, ["Hospital Census", "ICU Census", "Ventilated Census"])
+    return (
+        alt
+        .Chart(data)
+        .mark_line(point=True)
+        .encode(
+            x=alt.X("day", title="Days from today"),
+            y=alt.Y("value:Q", title="Census"),
+            color="key:N",
+            tooltip=["day", "key:N"]
+        )
+        .interactive()
+    )
+
+
+def additional_projections_chart(i: np.ndarray, r: np.ndarray) -> alt.Chart:
+    dat = pd.DataFrame({"day": np.arange(len(i)), "Infected": i, "Recovered": r})
+    data = long_format(dat, ["Infected", "Recovered"], decimals=0)
+
+    return (
+        alt
+        .Chart(data)
+        .mark_line()
+        .encode(
+            x=alt.X("day", title="Days from today"),
+            y=alt.Y("value:Q", title="Case Volume"),
+            tooltip=["key:N", "value:Q"],
+            color="key:N"
+        )
+        .interactive()
+    )
+
+
+def census_bands_chart(bands: pd.DataFrame, low: str = "p10", mid: str = "p50", high: str = "p90") -> alt.Chart:
+    """Census quantile bands from ensemble.run_ensemble"""
+    bands = bands.replace({"category": {"hosp": "Hospital Census", "icu": "ICU Census", "vent": "Ventilated Census"}})
+    bands = bands.dropna(subset=[low, mid, high])
+    keep = []
+    for _, group in bands.groupby("category", sort=False):
+        rows = np.unique(np.concatenate([peak_indices(group[c].to_numpy()) for c in (low, mid, high)]))
+        keep.append(group.iloc[rows])
+    bands = pd.concat(keep).round({low: 2, mid: 2, high: 2})
+    base = alt.Chart(bands).encode(
+        x=alt.X("day", title="Days from today"),
+        color=alt.Color("category:N", title=None),
+    )
+    band = base.mark_area(opacity=0.25).encode(
+        y=alt.Y(low + ":Q", title="Census"),
+        y2=high + ":Q",
+    )
+    line = base.mark_line().encode(
+        y=mid + ":Q",
+        tooltip=["day", "category:N", low + ":Q", mid + ":Q", high + ":Q"],
+    )
+    return (band + line).interactive()
+
+
+def schedule_comparison_chart(census: np.ndarray, labels, title: str = "Distancing schedule") -> alt.Chart:
+    """Daily hospital census under each schedule, from build_projection_batch, or of any stack of scenarios"""
+    wide = pd.DataFrame(census[:, :, 0].T)  # labels needn't be unique
+    wide["day"] = np.arange(len(wide))
+    data = long_format(wide, list(range(len(labels))))
+    data["key"] = np.asarray(labels, dtype=object)[data["key"].to_numpy(dtype=int)]
+    return (
+        alt
+        .Chart(data)
+        .mark_line()
+        .encode(
+            x=alt.X("day", title="Days from today"),
+            y=alt.Y("value:Q", title="Hospital Census"),
+            color=alt.Color("key:N", title=title),
+            tooltip=["day", "key:N", "value:Q"],
+        )
+        .interactive()
+    )
+
+
+def facility_census_chart(census: pd.DataFrame) -> alt.Chart:
+    """Hospital census per facility and for the system, from regions.regional_census_frame"""
+    wide = census.pivot(index="day", columns="facility", values="hosp").reset_index()
+    data = long_format(wide, list(census["facility"].unique()))
+    return (
+        alt
+        .Chart(data)
+        .mark_line()
+        .encode(
+            x=alt.X("day", title="Days from today"),
+            y=alt.Y("value:Q", title="Hospital Census"),
+            color=alt.Color("key:N", title=None),
+            tooltip=["day", "key:N", "value:Q"],
+        )
+        .interactive()
+    )
+
+
+class ChartSpec(NamedTuple):
+    spec: dict  # Vega-Lite, shared between reruns and sessions
+    payload_bytes: int  # size of the spec as JSON
+
+
+# specs per chart function and digest of its data
+spec_cache = LRUCache(maxsize=128)
+metrics.register_cache("chart_spec", spec_cache)
+
+
+def chart_spec(chart: Callable[..., alt.Chart], *args) -> ChartSpec:
+    """chart(*args) as a Vega-Lite spec, memoized on the chart and a digest of its arguments."""
+    key = (chart.__name__,) + tuple(_digest(arg) for arg in args)
+
+    def build():
+        spec = chart(*args).to_dict()
+        return ChartSpec(spec, len(json.dumps(spec, separators=(",", ":"))))
+
+    return spec_cache.get(key, build)
+
+
+def _digest(value):
+    if isinstance(value, pd.DataFrame):
+        data = pd.util.hash_pandas_object(value).to_numpy().tobytes() + repr(list(value.columns)).encode()
+    elif isinstance(value, np.ndarray):
+        data = np.ascontiguousarray(value).tobytes() + repr((value.shape, value.dtype.str)).encode()
+    else:
+        return repr(value)
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def tornado_chart(table: pd.DataFrame, baseline_peak: float, category: str = "hosp") -> alt.Chart:
+    """Peak census of a category as each input moves down and up, from sensitivity.sensitivity"""
+    peak, day = "peak_" + category, "day_" + category
+    data = table[["input", "side", "value", peak, day]].rename(columns={peak: "peak", day: "peak_day"})
+    data = data.assign(baseline=float(baseline_peak), swing=(data["peak"] - float(baseline_peak)).abs())
+    order = data.groupby("input")["swing"].max().sort_values(ascending=False, kind="stable").index.tolist()
+    return (
+        alt
+        .Chart(data)
+        .mark_bar()
+        .encode(
+            y=alt.Y("input:N", sort=order, title=None),
+            x=alt.X("peak:Q", title="Peak census"),
+            x2="baseline:Q",
+            color=alt.Color("side:N", title="Input moved", scale=alt.Scale(domain=["low", "high"])),
+            tooltip=["input:N", "side:N", "value:Q", "peak:Q", "peak_day:Q"],
+        )
+    )
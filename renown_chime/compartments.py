@@ -0,0 +1,167 @@
+"""SIR and SEIR compartment models with age strata and a contact matrix.
+
+The state is one contiguous (compartments, strata) array, e.g. the rows
+S, E, I, R for SEIR, with one column per age group. A daily step is a
+handful of array operations; new infections in stratum a are
+
+    beta * S[a] * (contact @ I)[a]
+
+where contact[a, b] is the relative rate at which people in a meet people
+in b. With one stratum and contact = [[1]], the SIR step performs the same
+floating point operations in the same order as models.sir, so
+sim_compartments reproduces sim_sir exactly.
+
+Hospitalization, ICU and ventilation rates may differ by stratum::
+
+    result = build_stratified_projection(
+        populations=[1.0e6, 2.5e6, 0.6e6], contact=contact,
+        hosp_rates=[0.005, 0.03, 0.15], icu_rates=[0.001, 0.01, 0.06], vent_rates=[0.0005, 0.005, 0.03],
+        incubation_days=5, current_hosp=4, doubling_time=6.0, n_days=120,
+    )
+"""
+
+from typing import NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .parameters import DEFAULTS, RECOVERY_DAYS, get_beta
+from .projections import admissions_from_patients, build_census_table
+
+SIR = ("S", "I", "R")
+SEIR = ("S", "E", "I", "R")
+
+
+def step(y, beta, gamma, N, contact, sigma=None, out=None) -> np.ndarray:
+    """One day of the SIR (3 rows) or SEIR (4 rows) model on a (compartments, strata) state."""
+    out = np.empty_like(y) if out is None else out
+    infected = y[-2]
+    new = beta * y[0] * (contact @ infected)
+    recovered = gamma * infected
+    out[0] = (-new) + y[0]
+    if sigma is None:
+        out[1] = (new - recovered) + infected
+    else:
+        progressed = sigma * y[1]
+        out[1] = (new - progressed) + y[1]
+        out[2] = (progressed - recovered) + infected
+    out[-1] = recovered + y[-1]
+    np.maximum(out, 0, out=out)
+
+    scale = N / _total(out)  # per stratum
+    out *= scale
+    return out
+
+
+def _total(y) -> np.ndarray:
+    total = y[0] + y[1]  # one compartment at a time, like sir
+    for row in y[2:]:
+        total = total + row
+    return total
+
+
+def sim_compartments(
+    y0, beta, gamma, n_days, contact=None, sigma=None, beta_decay=None, relative_contact_rates=None,
+) -> np.ndarray:
+    """Run the model forward; returns the (n_days + 1, compartments, strata) states.
+
+    y0 has 3 rows for SIR or 4 for SEIR (then sigma, one over the
+    incubation period, is required), and one column per stratum. contact
+    defaults to everyone meeting everyone alike within each stratum only,
+    i.e. the identity. beta_decay and relative_contact_rates are as in sim_sir.
+    """
+    y0 = np.asarray(y0, dtype=float)
+    if y0.ndim == 1:
+        y0 = y0[:, None]
+    if y0.shape[0] == 4 and sigma is None:
+        raise ValueError("an SEIR state needs sigma, one over the incubation period")
+    if y0.shape[0] not in (3, 4):
+        raise ValueError("state must have 3 (SIR) or 4 (SEIR) compartments")
+    contact = np.eye(y0.shape[1]) if contact is None else np.asarray(contact, dtype=float)
+    if contact.shape != (y0.shape[1],) * 2:
+        raise ValueError("contact matrix must be strata by strata")
+
+    states = np.empty((n_days + 1,) + y0.shape)
+    states[0] = y0
+    N = _total(y0)
+    for day in range(n_days):
+        b = beta if relative_contact_rates is None else beta * (1 - relative_contact_rates[day])
+        step(states[day], b, gamma, N, contact, sigma, out=states[day + 1])
+        if beta_decay:
+            beta = beta * (1 - beta_decay)
+    return states
+
+
+def get_stratified_beta(doubling_time, relative_contact_rate, S, contact, gamma, sigma=None) -> float:
+    """Contact rate that doubles the early epidemic every doubling_time days.
+
+    The growth rate is set by the spectral radius of diag(S) @ contact;
+    with one stratum this is get_beta.
+    """
+    S = np.atleast_1d(np.asarray(S, dtype=float))
+    contact = np.asarray(contact, dtype=float).reshape(len(S), len(S))
+    radius = S[0] * contact[0, 0] if len(S) == 1 else float(np.max(np.abs(np.linalg.eigvals(S[:, None] * contact))))
+    if sigma is None:
+        return get_beta(doubling_time, relative_contact_rate, radius, gamma)
+    growth = 2 ** (1 / doubling_time) - 1
+    # dominant eigenvalue of the linearized E, I step is 1 + growth
+    return (growth + sigma) * (growth + gamma) / (sigma * radius) * (1 - relative_contact_rate)
+
+
+class StratifiedProjection(NamedTuple):
+    compartments: Tuple[str, ...]
+    states: np.ndarray  # (n_days + 1, compartments, strata)
+    projection_admits: pd.DataFrame  # all strata, as in Projection
+    census_table: pd.DataFrame
+    admits_by_stratum: np.ndarray  # (n_days + 1, strata, categories), first and last day NaN
+
+
+def build_stratified_projection(
+    populations: Sequence[float],
+    hosp_rates: Sequence[float],
+    icu_rates: Sequence[float],
+    vent_rates: Sequence[float],
+    contact=None,
+    incubation_days: Optional[float] = None,
+    current_hosp: float = DEFAULTS["current_hosp"],
+    doubling_time: float = DEFAULTS["doubling_time"],
+    relative_contact_rate: float = DEFAULTS["relative_contact_rate"],
+    hosp_los: int = DEFAULTS["hosp_los"],
+    icu_los: int = DEFAULTS["icu_los"],
+    vent_los: int = DEFAULTS["vent_los"],
+    market_share: float = DEFAULTS["market_share"],
+    n_days: int = DEFAULTS["n_days"],
+) -> StratifiedProjection:
+    """Admissions and census from an age-stratified SIR, or SEIR with incubation_days.
+
+    Today's infections are spread over the strata by population, and for
+    SEIR the exposed start in proportion to the infected, as they would be
+    during exponential growth.
+    """
+    populations = np.asarray(populations, dtype=float)
+    rates = np.stack(np.broadcast_arrays(hosp_rates, icu_rates, vent_rates), axis=-1).astype(float)
+    rates = np.broadcast_to(rates, (len(populations), 3))
+    contact = np.eye(len(populations)) if contact is None else np.asarray(contact, dtype=float)
+    gamma = 1 / RECOVERY_DAYS
+    sigma = None if incubation_days is None else 1 / incubation_days
+
+    weights = populations / populations.sum()
+    I = current_hosp / market_share / (weights @ rates[:, 0]) * weights  # total_infections by stratum
+    beta = get_stratified_beta(doubling_time, relative_contact_rate, populations, contact, gamma, sigma)
+    if sigma is None:
+        y0 = np.stack([populations, I, np.zeros_like(I)])
+    else:
+        E = I * (2 ** (1 / doubling_time) - 1 + gamma) / sigma
+        y0 = np.stack([populations, E, I, np.zeros_like(I)])
+    states = sim_compartments(y0, beta, gamma, n_days, contact, sigma)
+
+    i, r = states[:, -2], states[:, -1]  # (n_days + 1, strata)
+    current = i[:, :, None] * rates * market_share
+    recovered = r[:, :, None] * rates * market_share
+    by_stratum = np.full(current.shape, np.nan)
+    by_stratum[1:-1] = (current[1:-1] - current[:-2]) + (recovered[1:-1] - recovered[:-2])
+
+    _, _, projection_admits = admissions_from_patients(*current.sum(axis=1).T, *recovered.sum(axis=1).T)
+    census_table = build_census_table(projection_admits, hosp_los, icu_los, vent_los)
+    compartments = SIR if sigma is None else SEIR
+    return StratifiedProjection(compartments, states, projection_admits, census_table, by_stratum)
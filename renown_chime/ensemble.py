@@ -0,0 +1,255 @@
+"""Monte Carlo ensembles of census projections.
+
+Inputs are sampled from distributions, every trajectory is run through the
+batch pipeline, and the daily census is reduced to quantile bands chunk by
+chunk, so no more than one chunk of trajectories is held at a time::
+
+    result = run_ensemble(
+        {"doubling_time": parse_distribution("triangular:4,6,9"),
+         "hosp_rate": parse_distribution("uniform:0.03,0.08")},
+        n_trajectories=5000, n_days=120, seed=42,
+    )
+    result.bands  # day, category, p10, p50, p90
+
+With ``capacity``, every trajectory's census is also reduced to a
+capacity.CapacityReport, e.g. for the chance of running out of ICU beds
+within 30 days, exceedance_probability(result.capacity, 30)[1].
+
+Each chunk draws from its own stream spawned from the seed, and the
+quantile sketches merge by adding integer counts, so the same seed gives the
+same bands however many workers run the chunks.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, NamedTuple, Optional, Sequence, Tuple
+import math
+
+import numpy as np
+import pandas as pd
+
+from . import metrics
+from .cache import LRUCache
+from .capacity import CapacityReport, capacity_report
+from .parameters import DEFAULTS
+from .projections import CATEGORIES, build_projection_batch
+from .schedules import contact_schedule
+
+# distribution name -> number of arguments, see parse_distribution
+DISTRIBUTIONS = {"fixed": 1, "uniform": 2, "normal": 2, "lognormal": 2, "triangular": 3}
+
+# sampled values are clipped into these ranges
+BOUNDS = {
+    "current_hosp": (0, None),
+    "doubling_time": (0.1, None),
+    "relative_contact_rate": (0.0, 0.99),
+    "hosp_rate": (1e-6, 1.0),
+    "icu_rate": (0.0, 1.0),
+    "vent_rate": (0.0, 1.0),
+    "hosp_los": (1, None),
+    "icu_los": (1, None),
+    "vent_los": (1, None),
+    "market_share": (1e-6, 1.0),
+    "S": (1, None),
+}
+WHOLE = {"current_hosp", "hosp_los", "icu_los", "vent_los", "S"}
+
+Distribution = Tuple  # (name, *args)
+
+
+def parse_distribution(spec: str) -> Distribution:
+    """``uniform:low,high``, ``normal:mean,sd``, ``lognormal:mean,sigma``
+    (of the underlying normal), ``triangular:left,mode,right`` or a number."""
+    name, _, args = spec.partition(":")
+    if not args:
+        return ("fixed", float(name))
+    values = tuple(float(x) for x in args.split(","))
+    if DISTRIBUTIONS.get(name) != len(values):
+        raise ValueError("bad distribution {!r}, expected one of {}".format(spec, ", ".join(DISTRIBUTIONS)))
+    return (name,) + values
+
+
+def parse_distributions(text: str) -> Dict[str, Distribution]:
+    """One ``input=distribution`` per line, e.g. ``hosp_los=normal:7,1.5``."""
+    distributions = {}
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        name, sep, spec = line.partition("=")
+        if not sep or name.strip() not in BOUNDS:
+            raise ValueError("expected input=distribution with a model input, got {!r}".format(line.strip()))
+        distributions[name.strip()] = parse_distribution(spec.strip())
+    return distributions
+
+
+def sample(
+    distributions: Dict[str, Distribution], n: int, rng: np.random.Generator, base: Optional[Dict] = None,
+) -> Dict[str, np.ndarray]:
+    """n draws of every model input.
+
+    Inputs without a distribution keep their value in base, or else the
+    sidebar default.
+    """
+    base = dict(DEFAULTS, **(base or {}))
+    drawn = {}
+    for name in BOUNDS:
+        kind, *args = distributions.get(name, ("fixed", base[name]))
+        if kind == "fixed":
+            values = np.full(n, args[0], dtype=float)
+        else:
+            values = getattr(rng, kind)(*args, size=n)
+        low, high = BOUNDS[name]
+        values = np.clip(values, low, high)
+        drawn[name] = np.round(values) if name in WHOLE else values
+    return drawn
+
+
+class QuantileSketch:
+    """Mergeable per-cell quantile sketch with bounded relative error.
+
+    Values are counted in logarithmic buckets (a DDSketch), so memory does
+    not grow with the number of values added and two sketches merge by
+    adding counts. Values at or below zero share one bucket; positive values
+    below ``min_value`` are counted as ``min_value``.
+    """
+
+    def __init__(self, shape: Sequence[int], relative_accuracy: float = 0.005, min_value: float = 1.0):
+        self.shape = tuple(shape)
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.min_value = min_value
+        self._offset = math.ceil(math.log(min_value, self.gamma)) - 1
+        self.counts = np.zeros((1, int(np.prod(self.shape))), dtype=np.int64)
+
+    def add(self, values: np.ndarray):
+        """Count values of shape (samples, *shape); NaN values are skipped."""
+        values = np.asarray(values, dtype=float).reshape(-1, self.counts.shape[1])
+        cells = np.broadcast_to(np.arange(values.shape[1]), values.shape)
+        keep = ~np.isnan(values)
+        values, cells = values[keep], cells[keep]
+
+        buckets = np.zeros(values.shape, dtype=np.int64)
+        positive = values > 0
+        buckets[positive] = np.ceil(
+            np.log(np.maximum(values[positive], self.min_value)) / math.log(self.gamma)
+        ).astype(np.int64) - self._offset
+        self._grow(int(buckets.max(initial=0)) + 1)
+
+        n_cells = self.counts.shape[1]
+        self.counts += np.bincount(
+            buckets * n_cells + cells, minlength=self.counts.size
+        ).reshape(self.counts.shape)
+
+    def merge(self, other: "QuantileSketch"):
+        self._grow(other.counts.shape[0])
+        self.counts[: other.counts.shape[0]] += other.counts
+
+    def quantile(self, q: float) -> np.ndarray:
+        """Estimated q-quantile of every cell, NaN where nothing was counted."""
+        cumulative = np.cumsum(self.counts, axis=0)
+        total = cumulative[-1]
+        rank = np.floor(q * (total - 1))
+        bucket = (cumulative > rank).argmax(axis=0)
+        value = np.where(
+            bucket == 0, 0.0, 2 * self.gamma ** (bucket + self._offset) / (self.gamma + 1)
+        )
+        return np.where(total > 0, value, np.nan).reshape(self.shape)
+
+    def _grow(self, n_buckets: int):
+        if n_buckets > self.counts.shape[0]:
+            extra = np.zeros((n_buckets - self.counts.shape[0], self.counts.shape[1]), dtype=np.int64)
+            self.counts = np.vstack([self.counts, extra])
+
+
+class EnsembleResult(NamedTuple):
+    n_trajectories: int
+    sketch: QuantileSketch  # census, cells of shape (n_days, categories)
+    bands: pd.DataFrame
+    capacity: Optional[CapacityReport] = None  # one row per trajectory
+
+
+def run_chunk(
+    distributions, base, n, n_days, seed_sequence, relative_accuracy, engine="euler", capacity=None, schedule=(),
+) -> Tuple[QuantileSketch, Optional[CapacityReport]]:
+    """Sample, simulate and sketch one chunk of trajectories, and reduce them against capacity if given."""
+    rng = np.random.default_rng(seed_sequence)
+    params = sample(distributions, n, rng, base)
+    # each trajectory's relative_contact_rate holds until the schedule's first change
+    contact_rates = contact_schedule(schedule, n_days, params["relative_contact_rate"]) if schedule else None
+    result = build_projection_batch(
+        **params, n_days=n_days, mask_tail=False, contact_rates=contact_rates, engine=engine,
+    )
+    census = result.census[:, :n_days]  # the last day has no admissions
+    sketch = QuantileSketch((n_days, len(CATEGORIES)), relative_accuracy)
+    sketch.add(census)
+    return sketch, None if capacity is None else capacity_report(census, capacity)
+
+
+def run_ensemble(
+    distributions: Dict[str, Distribution],
+    n_trajectories: int,
+    n_days: int,
+    seed: Optional[int] = 0,
+    quantiles: Sequence[float] = (0.1, 0.5, 0.9),
+    chunk_size: int = 1000,
+    workers: int = 1,
+    relative_accuracy: float = 0.005,
+    base: Optional[Dict] = None,
+    engine: str = "euler",
+    capacity: Optional[Sequence[float]] = None,
+    schedule: Sequence[Tuple[int, float]] = (),
+) -> EnsembleResult:
+    """Census quantile bands over n_trajectories sampled scenarios.
+
+    ``base`` holds the values of the inputs that are not sampled, and
+    ``engine`` is one of ode.ENGINES. ``capacity`` is one bed count per
+    category, see capacity.capacity_report. ``schedule`` lists later changes
+    in distancing as in build_projection. Chunks run on up to ``workers``
+    processes, never more than there are chunks.
+    """
+    unknown = set(distributions) - set(BOUNDS)
+    if unknown:
+        raise ValueError("unknown inputs: {}".format(", ".join(sorted(unknown))))
+
+    sizes = [chunk_size] * (n_trajectories // chunk_size)
+    if n_trajectories % chunk_size:
+        sizes.append(n_trajectories % chunk_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    jobs = [
+        (distributions, base, size, n_days, s, relative_accuracy, engine, capacity, tuple(schedule))
+        for size, s in zip(sizes, seeds)
+    ]
+
+    sketch = QuantileSketch((n_days, len(CATEGORIES)), relative_accuracy)
+    reports = []
+    workers = min(workers, len(jobs))  # no idle processes for small ensembles
+    if workers <= 1:
+        for job in jobs:
+            part, report = run_chunk(*job)
+            sketch.merge(part)
+            reports.append(report)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for part, report in pool.map(run_chunk, *zip(*jobs)):
+                sketch.merge(part)
+                reports.append(report)
+
+    bands = {"day": np.repeat(np.arange(n_days), len(CATEGORIES)), "category": CATEGORIES * n_days}
+    for q in quantiles:
+        bands["p{:g}".format(100 * q)] = sketch.quantile(q).ravel()
+    report = None if capacity is None else CapacityReport(*(np.concatenate(arrays) for arrays in zip(*reports)))
+    return EnsembleResult(n_trajectories, sketch, pd.DataFrame(bands), report)
+
+
+# a few ensembles only: each holds a census sketch and, with capacity, a row per trajectory
+ensemble_cache = LRUCache(maxsize=32)
+metrics.register_cache("ensemble", ensemble_cache)
+
+
+def cached_ensemble(distributions, n_trajectories, n_days, seed=0, base=None, **kwargs) -> EnsembleResult:
+    """run_ensemble, memoized on its arguments."""
+    key = (
+        tuple(sorted(distributions.items())), n_trajectories, n_days, seed,
+        tuple(sorted((base or {}).items())), tuple(sorted(kwargs.items())),
+    )
+    return ensemble_cache.get(
+        key, lambda: run_ensemble(distributions, n_trajectories, n_days, seed=seed, base=base, **kwargs)
+    )
@@ -0,0 +1,165 @@
+"""Calibrate the doubling time and social distancing to an observed census.
+
+Given the daily hospital census up to today, the model is started from the
+first observed day and run for every candidate on a grid, all at once
+through sim_sir_batch. The grid is then refined around the best candidate.
+Patients already in hospital on the first day are assumed to leave evenly
+over one hospital length of stay.
+
+With ``change_point=True`` the fit also looks for the day social
+distancing changed and the contact reduction since then, which is what
+the sidebar's "Social distancing" input describes today.
+"""
+
+from typing import NamedTuple, Optional, Sequence
+
+import numpy as np
+
+from . import metrics
+from .cache import LRUCache
+from .census import census_from_admits
+from .models import sim_sir_batch
+from .parameters import RECOVERY_DAYS, get_beta
+from .projections import batch_admissions
+
+
+class Fit(NamedTuple):
+    doubling_time: float  # before any change in distancing
+    relative_contact_rate: float  # in effect today
+    change_day: Optional[int]  # first observed day with the new distancing
+    rmse: float
+    census: np.ndarray  # modeled census on the observed days
+
+
+def model_census(observed, doubling_time, contact_before, contact_after, change_day,
+                 hosp_rate, market_share, hosp_los, S) -> np.ndarray:
+    """Modeled hospital census on the observed days, one row per candidate.
+
+    The candidate arrays broadcast against each other; the model starts
+    from observed[0] patients, like the app starts from today's.
+    """
+    observed = np.asarray(observed, dtype=float)
+    n_days = len(observed)
+    doubling_time, contact_before, contact_after, change_day = (
+        np.atleast_1d(x) for x in np.broadcast_arrays(doubling_time, contact_before, contact_after, change_day)
+    )
+
+    gamma = 1 / RECOVERY_DAYS
+    beta = get_beta(doubling_time, 0.0, S, gamma)
+    contact = np.where(np.arange(n_days) < change_day[:, None], contact_before[:, None], contact_after[:, None])
+    I = observed[0] / market_share / hosp_rate
+    s, i, r = sim_sir_batch(S, I, 0, beta[:, None] * (1 - contact), gamma, n_days)
+
+    admits = batch_admissions(i, r, hosp_rate, 0.0, 0.0, market_share)[:, :n_days, :1]
+    census = census_from_admits(admits, [hosp_los])[:, :, 0]
+    already_in = observed[0] * np.clip(1 - np.arange(n_days) / hosp_los, 0, None)
+    return census + already_in
+
+
+def _best(observed, candidates, **inputs):
+    """Candidate with the least squared error, evaluated in bounded chunks."""
+    best, best_sse = None, np.inf
+    n = len(candidates[0])
+    for start in range(0, n, 20000):
+        chunk = [c[start:start + 20000] for c in candidates]
+        census = model_census(observed, *chunk, **inputs)
+        sse = ((census - observed) ** 2).sum(axis=1)
+        k = int(np.argmin(sse))
+        if sse[k] < best_sse:
+            best, best_sse = tuple(c[k] for c in chunk), sse[k]
+    return best
+
+
+def fit_census(
+    observed: Sequence[float],
+    hosp_rate: float,
+    market_share: float,
+    hosp_los: int,
+    S: float,
+    relative_contact_rate: float = 0.0,
+    change_point: bool = False,
+) -> Fit:
+    """Fit the doubling time, and optionally a change point, to observed census.
+
+    Without a change point the contact reduction stays at
+    ``relative_contact_rate`` and only the doubling time is fit, since the
+    two can't be told apart from one growth rate. With a change point,
+    ``relative_contact_rate`` is the reduction before the change.
+
+    The model can't grow from zero patients, so the fit starts on the
+    first day with any; the modeled census is zero before it, and the RMSE
+    is over the fitted days.
+    """
+    observed = np.asarray(observed, dtype=float)
+    if observed.ndim != 1 or len(observed) < 3:
+        raise ValueError("need a census history of at least 3 days")
+    if (observed < 0).any() or not np.isfinite(observed).all():
+        raise ValueError("census history must be non-negative numbers")
+    first = int(np.argmax(observed > 0)) if (observed > 0).any() else len(observed)
+    if len(observed) - first < 3:
+        raise ValueError("need at least 3 days of census from the first day with patients")
+    if first:
+        fit = fit_census(observed[first:], hosp_rate, market_share, hosp_los, S, relative_contact_rate, change_point)
+        return fit._replace(
+            change_day=None if fit.change_day is None else fit.change_day + first,
+            census=np.concatenate([np.zeros(first), fit.census]),
+        )
+    inputs = dict(hosp_rate=hosp_rate, market_share=market_share, hosp_los=hosp_los, S=S)
+    n_days = len(observed)
+
+    def grid(doubling_times, contacts, change_days):
+        axes = np.meshgrid(doubling_times, [relative_contact_rate], contacts, change_days, indexing="ij")
+        return [a.ravel() for a in axes]
+
+    def around(center, radius, step, low, high):
+        return np.clip(np.arange(center - radius, center + radius + step / 2, step), low, high)
+
+    # coarse pass, then finer ones around the best candidate
+    stride = max(1, n_days // 15)
+    if change_point:
+        contacts, change_days = np.arange(0, 0.91, 0.1), np.arange(1, n_days, stride)
+    else:
+        contacts, change_days = [relative_contact_rate], [n_days]
+    doubling_time, _, contact, change_day = _best(
+        observed, grid(np.arange(1, 30.01, 0.5), contacts, change_days), **inputs
+    )
+
+    for radius, step in [(0.5, 0.05), (0.05, 0.01)]:
+        if change_point:
+            contacts = around(contact, 2 * radius / 5, step, 0, 0.99)
+            change_days = np.unique(around(change_day, stride, 1, 1, n_days - 1))
+            stride = 1
+        doubling_time, _, contact, change_day = _best(
+            observed, grid(around(doubling_time, radius, step, 0.5, None), contacts, change_days), **inputs
+        )
+
+    census = model_census(observed, doubling_time, relative_contact_rate, contact, change_day, **inputs)[0]
+    return Fit(
+        doubling_time=round(float(doubling_time), 2),
+        relative_contact_rate=round(float(contact), 2),
+        change_day=int(change_day) if change_point else None,
+        rmse=float(np.sqrt(np.mean((census - observed) ** 2))),
+        census=census,
+    )
+
+
+def parse_census(text: str) -> np.ndarray:
+    """Daily census numbers separated by commas, spaces or new lines."""
+    values = text.replace(",", " ").split()
+    try:
+        return np.array([float(x) for x in values])
+    except ValueError:
+        raise ValueError("census history must be numbers separated by commas or spaces")
+
+
+# fits per observed census history and fixed inputs
+fit_cache = LRUCache(maxsize=64)
+metrics.register_cache("fit", fit_cache)
+
+
+def cached_fit(observed, hosp_rate, market_share, hosp_los, S, relative_contact_rate=0.0, change_point=False) -> Fit:
+    key = (tuple(np.asarray(observed, dtype=float)), float(hosp_rate), float(market_share), int(hosp_los),
+           float(S), float(relative_contact_rate), bool(change_point))
+    return fit_cache.get(key, lambda: fit_census(
+        observed, hosp_rate, market_share, hosp_los, S, relative_contact_rate, change_point
+    ))
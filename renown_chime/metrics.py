@@ -0,0 +1,206 @@
+"""Opt-in Prometheus metrics for the app and the model core.
+
+Set ``CHIME_METRICS_PORT`` to serve stage latencies, cache hit ratios and
+simulation throughput in the Prometheus text format on
+``http://<host>:<port>/metrics``::
+
+    CHIME_METRICS_PORT=9100 streamlit run app.py
+
+Without it, timer() hands out one shared no-op context manager and the
+other calls return straight away, so instrumented code costs next to
+nothing. Only the standard library is used.
+"""
+
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Sequence
+import contextlib
+import os
+import threading
+import time
+
+ENABLED = bool(os.environ.get("CHIME_METRICS_PORT"))
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BYTES_BUCKETS = (1e3, 5e3, 1e4, 2.5e4, 5e4, 1e5, 2.5e5, 5e5, 1e6, 5e6)
+
+_lock = threading.Lock()
+_metrics: List["_Metric"] = []
+_caches: Dict[str, object] = {}
+_NULL = contextlib.nullcontext()
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, label: str):
+        self.name, self.help, self.label = name, help, label
+        _metrics.append(self)
+
+    def _labels(self, value: str, extra: str = "") -> str:
+        pairs = ['{}="{}"'.format(self.label, value)] if value else []
+        return "{" + ",".join(pairs + ([extra] if extra else [])) + "}" if pairs or extra else ""
+
+    def lines(self) -> List[str]:
+        return ["# HELP {} {}".format(self.name, self.help), "# TYPE {} {}".format(self.name, self.kind)]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, buckets: Sequence[float], label: str = ""):
+        super().__init__(name, help, label)
+        self.buckets = tuple(buckets)
+        self._series: Dict[str, list] = {}  # label value -> [bucket counts, sum, count]
+
+    def observe(self, value: float, label_value: str = ""):
+        with _lock:
+            series = self._series.setdefault(label_value, [[0] * len(self.buckets), 0.0, 0])
+            k = bisect_left(self.buckets, value)
+            if k < len(self.buckets):
+                series[0][k] += 1
+            series[1] += value
+            series[2] += 1
+
+    def lines(self) -> List[str]:
+        lines = super().lines()
+        with _lock:
+            series = {k: (list(v[0]), v[1], v[2]) for k, v in self._series.items()}
+        for value, (counts, total, count) in sorted(series.items()):
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                lines.append("{}_bucket{} {}".format(self.name, self._labels(value, 'le="{:g}"'.format(bound)), cumulative))
+            lines.append("{}_bucket{} {}".format(self.name, self._labels(value, 'le="+Inf"'), count))
+            lines.append("{}_sum{} {!r}".format(self.name, self._labels(value), total))
+            lines.append("{}_count{} {}".format(self.name, self._labels(value), count))
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, label: str = ""):
+        super().__init__(name, help, label)
+        self._values: Dict[str, float] = {}
+
+    def inc(self, amount: float = 1, label_value: str = ""):
+        with _lock:
+            self._values[label_value] = self._values.get(label_value, 0) + amount
+
+    def lines(self) -> List[str]:
+        with _lock:
+            values = dict(self._values)
+        return super().lines() + [
+            "{}{} {!r}".format(self.name, self._labels(k), float(v)) for k, v in sorted(values.items())
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, label_value: str = ""):
+        with _lock:
+            self._values[label_value] = value
+
+
+STAGE_SECONDS = Histogram("chime_stage_seconds", "Time spent in each stage of a rerun.", LATENCY_BUCKETS, "stage")
+CHART_PAYLOAD_BYTES = Histogram("chime_chart_payload_bytes", "Chart spec bytes sent per rerun.", BYTES_BUCKETS)
+SCENARIOS = Counter("chime_scenarios_total", "Scenarios simulated.", "engine")
+SCENARIOS_PER_SECOND = Gauge("chime_scenarios_per_second", "Throughput of the last simulation run.", "engine")
+
+
+class _Timer:
+    __slots__ = ("stage", "started")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        STAGE_SECONDS.observe(time.perf_counter() - self.started, self.stage)
+
+
+def timer(stage: str):
+    """Context manager timing a stage into chime_stage_seconds."""
+    return _Timer(stage) if ENABLED else _NULL
+
+
+def clock() -> float:
+    """Start time for record(), for stages that don't fit a with block."""
+    return time.perf_counter() if ENABLED else 0.0
+
+
+def record(stage: str, started: float):
+    if ENABLED:
+        STAGE_SECONDS.observe(time.perf_counter() - started, stage)
+
+
+def scenarios(engine: str, n: int, seconds: float):
+    """Count n scenarios simulated by an engine in the given time."""
+    if ENABLED:
+        SCENARIOS.inc(n, engine)
+        SCENARIOS_PER_SECOND.set(n / max(seconds, 1e-9), engine)
+
+
+def chart_payload(n_bytes: int):
+    if ENABLED:
+        CHART_PAYLOAD_BYTES.observe(n_bytes)
+
+
+def register_cache(name: str, cache):
+    """Export an LRUCache's hits, misses, size and hit ratio."""
+    _caches[name] = cache
+
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in _metrics:
+        lines += metric.lines()
+    for name, help, attribute, kind in [
+        ("chime_cache_hits_total", "Cache hits.", "hits", "counter"),
+        ("chime_cache_misses_total", "Cache misses.", "misses", "counter"),
+        ("chime_cache_size", "Entries in the cache.", "__len__", "gauge"),
+        ("chime_cache_hit_ratio", "Hits over lookups since start.", "hit_ratio", "gauge"),
+    ]:
+        lines += ["# HELP {} {}".format(name, help), "# TYPE {} {}".format(name, kind)]
+        for cache_name, cache in sorted(_caches.items()):
+            value = len(cache) if attribute == "__len__" else getattr(cache, attribute)
+            lines.append('{}{{cache="{}"}} {!r}'.format(name, cache_name, float(value)))
+    return "\n".join(lines) + "\n"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+_server: Optional[ThreadingHTTPServer] = None
+
+
+def serve(port: Optional[int] = None) -> Optional[ThreadingHTTPServer]:
+    """Start the /metrics endpoint once per process; a no-op unless enabled."""
+    global _server
+    with _lock:
+        if not ENABLED or _server is not None:
+            return _server
+        if port is None:
+            port = int(os.environ["CHIME_METRICS_PORT"])
+        _server = ThreadingHTTPServer((os.environ.get("CHIME_METRICS_HOST", ""), port), _Handler)
+        threading.Thread(target=_server.serve_forever, name="chime-metrics", daemon=True).start()
+        return _server
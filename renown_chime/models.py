@@ -0,0 +1,94 @@
+"""Discrete-time SIR model."""
+
+import numpy as np
+
+
+# The SIR model, one time step
+def sir(y, beta, gamma, N):
+    S, I, R = y
+    Sn = (-beta * S * I) + S
+    In = (beta * S * I - gamma * I) + I
+    Rn = gamma * I + R
+    if Sn < 0:
+        Sn = 0
+    if In < 0:
+        In = 0
+    if Rn < 0:
+        Rn = 0
+
+    scale = N / (Sn + In + Rn)
+    return Sn * scale, In * scale, Rn * scale
+
+
+# Run the SIR model forward in time
+def sim_sir(S, I, R, beta, gamma, n_days, beta_decay=None, relative_contact_rates=None, N=None):
+    """relative_contact_rates, if given, is the contact reduction on each of
+    the n_days (see schedules.contact_schedule) and scales beta day by day.
+
+    N is the population every day is rescaled to, S + I + R by default;
+    pass the original run's N to continue it from its last day."""
+    N = S + I + R if N is None else N
+    s, i, r = [S], [I], [R]
+    for day in range(n_days):
+        y = S, I, R
+        if relative_contact_rates is None:
+            S, I, R = sir(y, beta, gamma, N)
+        else:
+            S, I, R = sir(y, beta * (1 - relative_contact_rates[day]), gamma, N)
+        if beta_decay:
+            beta = beta * (1 - beta_decay)
+        s.append(S)
+        i.append(I)
+        r.append(R)
+
+    s, i, r = np.array(s), np.array(i), np.array(r)
+    return s, i, r
+
+
+# Run many SIR scenarios forward in time at once
+def sim_sir_batch(S, I, R, beta, gamma, n_days, beta_decay=None):
+    """Vectorized sim_sir over a batch of scenarios.
+
+    S, I, R, beta, gamma and beta_decay may be scalars or 1-d arrays of the
+    same length (one entry per scenario). Returns s, i, r arrays of shape
+    (scenarios, n_days + 1) that match sim_sir row for row.
+
+    beta may also be a (scenarios, n_days) array with the contact rate of
+    every scenario on every day, in place of beta_decay.
+    """
+    beta = np.asarray(beta, dtype=float)
+    schedule = None
+    if beta.ndim == 2:
+        if beta_decay:
+            raise ValueError("a per-day beta can't be combined with beta_decay")
+        if beta.shape[1] < n_days:
+            raise ValueError("per-day beta needs at least n_days columns")
+        schedule, beta = beta, beta[:, 0]
+
+    S, I, R, beta, gamma = np.broadcast_arrays(
+        *(np.atleast_1d(np.asarray(x, dtype=float)) for x in (S, I, R, beta, gamma))
+    )
+    decay = np.broadcast_to(
+        np.asarray(0.0 if beta_decay is None else beta_decay, dtype=float), S.shape
+    )
+    N = S + I + R
+    beta = beta.copy()
+
+    s = np.empty((S.shape[0], n_days + 1))
+    i = np.empty_like(s)
+    r = np.empty_like(s)
+    s[:, 0], i[:, 0], r[:, 0] = S, I, R
+    for day in range(n_days):
+        if schedule is not None:
+            beta = schedule[:, day]
+        S, I, R = s[:, day], i[:, day], r[:, day]
+        # same operation order as sir() so results agree to the last bit
+        Sn = np.maximum((-beta * S * I) + S, 0)
+        In = np.maximum((beta * S * I - gamma * I) + I, 0)
+        Rn = np.maximum(gamma * I + R, 0)
+        scale = N / (Sn + In + Rn)
+        s[:, day + 1], i[:, day + 1], r[:, day + 1] = Sn * scale, In * scale, Rn * scale
+        if schedule is None:
+            beta = np.where(decay != 0, beta * (1 - decay), beta)
+
+    return s, i, r
@@ -0,0 +1,217 @@
+"""Continuous-time SIR model, integrated with sub-daily or adaptive steps.
+
+An alternative to the daily forward-Euler steps of models.sim_sir for long
+horizons and fast growth, where a one-day step overshoots and has to be
+clamped at zero. The ODEs
+
+    dS/dt = -beta S I,    dI/dt = beta S I - gamma I,    dR/dt = gamma I
+
+are integrated with the classic fourth order Runge-Kutta method at a fixed
+number of steps per day ("rk4"), or with adaptive Dormand-Prince 5(4) steps
+("rk45"), and sampled once a day into preallocated arrays. The contact rate
+is held for the whole of each day, as in sim_sir.
+
+Euler's beta comes from discrete daily growth, 2 ** (1 / doubling_time) - 1;
+the ODE needs the continuous rate, log(2) / doubling_time, for the
+epidemic to double in doubling_time days, see get_ode_beta.
+"""
+
+from typing import Tuple
+import math
+
+import numpy as np
+
+# engine name -> sidebar label
+ENGINES = {
+    "euler": "Daily steps (Euler)",
+    "rk4": "Runge-Kutta, 4 steps a day",
+    "rk45": "Adaptive Runge-Kutta (Dormand-Prince)",
+}
+
+# Dormand-Prince 5(4) tableau
+_A = [
+    [],
+    [1 / 5],
+    [3 / 40, 9 / 40],
+    [44 / 45, -56 / 15, 32 / 9],
+    [19372 / 6561, -25360 / 2187, 64448 / 6561, -212 / 729],
+    [9017 / 3168, -355 / 33, 46732 / 5247, 49 / 176, -5103 / 18656],
+    [35 / 384, 0, 500 / 1113, 125 / 192, -2187 / 6784, 11 / 84],
+]
+_B = np.array(_A[6] + [0])  # fifth order weights, also the last stage
+_E = _B - np.array([5179 / 57600, 0, 7571 / 16695, 393 / 640, -92097 / 339200, 187 / 2100, 1 / 40])
+
+
+def get_ode_beta(doubling_time, relative_contact_rate, S, gamma):
+    """Contact rate that doubles the continuous-time epidemic every doubling_time days."""
+    return (np.log(2) / doubling_time + gamma) / S * (1 - relative_contact_rate)
+
+
+def _rates(y, beta, gamma):
+    S, I = y[0], y[1]
+    infections = beta * S * I
+    recoveries = gamma * I
+    return np.stack([-infections, infections - recoveries, recoveries])
+
+
+def _daily_beta(beta, n_days, beta_decay, relative_contact_rates, n_scenarios):
+    """(scenarios, n_days) contact rate in effect on each day."""
+    beta = np.asarray(beta, dtype=float)
+    if beta.ndim == 2:
+        if beta_decay:
+            raise ValueError("a per-day beta can't be combined with beta_decay")
+        if beta.shape[1] < n_days:
+            raise ValueError("per-day beta needs at least n_days columns")
+        daily = beta[:, :n_days]
+    else:
+        decay = np.reshape(0.0 if beta_decay is None else beta_decay, (-1, 1))
+        daily = np.reshape(beta, (-1, 1)) * (1 - decay) ** np.arange(n_days)
+    if relative_contact_rates is not None:
+        daily = daily * (1 - np.asarray(relative_contact_rates, dtype=float)[..., :n_days])
+    return np.broadcast_to(daily, (n_scenarios, n_days))
+
+
+def sim_sir_ode_batch(
+    S, I, R, beta, gamma, n_days, beta_decay=None, relative_contact_rates=None,
+    method: str = "rk4", steps_per_day: int = 4, rtol: float = 1e-6, atol: float = 1e-6,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Integrate many scenarios at once; same inputs and output shapes as sim_sir_batch.
+
+    beta may be a (scenarios, n_days) per-day contact rate. The rk45 steps
+    are shared by all scenarios, sized for the one with the largest error.
+    """
+    S, I, R, gamma = np.broadcast_arrays(*(np.atleast_1d(np.asarray(x, dtype=float)) for x in (S, I, R, gamma)))
+    n_scenarios = max(S.shape[0], np.shape(beta)[0] if np.ndim(beta) else 1)
+    S, I, R, gamma = (np.broadcast_to(x, (n_scenarios,)) for x in (S, I, R, gamma))
+    betas = _daily_beta(beta, n_days, beta_decay, relative_contact_rates, n_scenarios)
+
+    out = np.empty((3, n_scenarios, n_days + 1))
+    y = np.stack([S, I, R])
+    out[:, :, 0] = y
+    if method == "rk4":
+        h = 1.0 / steps_per_day
+        for day in range(n_days):
+            b = betas[:, day]
+            for _ in range(steps_per_day):
+                k1 = _rates(y, b, gamma)
+                k2 = _rates(y + h / 2 * k1, b, gamma)
+                k3 = _rates(y + h / 2 * k2, b, gamma)
+                k4 = _rates(y + h * k3, b, gamma)
+                y = y + h / 6 * (k1 + 2 * k2 + 2 * k3 + k4)
+            out[:, :, day + 1] = y
+    elif method == "rk45":
+        h = 0.5
+        for day in range(n_days):
+            b = betas[:, day]
+            y, h = _dopri_day(y, b, gamma, h, rtol, atol)
+            out[:, :, day + 1] = y
+    else:
+        raise ValueError("unknown method {!r}, expected rk4 or rk45".format(method))
+
+    np.maximum(out, 0, out=out)
+    return out[0], out[1], out[2]
+
+
+def _dopri_day(y, beta, gamma, h, rtol, atol):
+    """Adaptive Dormand-Prince steps over one day; returns the state and next step size."""
+    t = 0.0
+    k = np.empty((7,) + y.shape)
+    k[0] = _rates(y, beta, gamma)
+    while t < 1.0:
+        step = min(h, 1.0 - t)
+        for stage in range(1, 7):
+            k[stage] = _rates(y + step * np.tensordot(_A[stage], k[:stage], axes=1), beta, gamma)
+        y_new = y + step * np.tensordot(_B[:6], k[:6], axes=1)
+        error = step * np.tensordot(_E, k, axes=1)
+        scale = atol + rtol * np.maximum(np.abs(y), np.abs(y_new))
+        # RMS over each scenario's compartments, so batch-mates can't dilute its error
+        norm = float(np.sqrt(np.mean((error / scale) ** 2, axis=0)).max())
+        h = _next_step(h, step, norm)
+        if norm <= 1.0:
+            t += step
+            y = y_new
+            k[0] = k[6]  # first same as last
+    return y, h
+
+
+def _next_step(h, step, norm):
+    """Step size after a step of size step with the given error norm."""
+    if norm <= 1.0 and step < h:
+        return h  # cut short by the end of the day, not by the error
+    return step * min(5.0, max(0.2, 0.9 * norm ** -0.2 if norm > 0 else 5.0))
+
+
+def _rk4_scalar(y, betas, gamma, steps_per_day, out):
+    """sim_sir_ode_batch's rk4 for one scenario, on floats rather than tiny arrays."""
+    S, I, R = y
+    h = 1.0 / steps_per_day
+    for day, beta in enumerate(betas, 1):
+        for _ in range(steps_per_day):
+            f1 = beta * S * I
+            g1 = gamma * I
+            S2, I2 = S - h / 2 * f1, I + h / 2 * (f1 - g1)
+            f2 = beta * S2 * I2
+            g2 = gamma * I2
+            S3, I3 = S - h / 2 * f2, I + h / 2 * (f2 - g2)
+            f3 = beta * S3 * I3
+            g3 = gamma * I3
+            S4, I4 = S - h * f3, I + h * (f3 - g3)
+            f4 = beta * S4 * I4
+            g4 = gamma * I4
+            S -= h / 6 * (f1 + 2 * f2 + 2 * f3 + f4)
+            I += h / 6 * (f1 + 2 * f2 + 2 * f3 + f4 - g1 - 2 * g2 - 2 * g3 - g4)
+            R += h / 6 * (g1 + 2 * g2 + 2 * g3 + g4)
+        out[:, day] = S, I, R
+
+
+def _rk45_scalar(y, betas, gamma, rtol, atol, out):
+    """sim_sir_ode_batch's rk45 for one scenario, on floats rather than tiny arrays."""
+    A, B, E = _A, _B.tolist(), _E.tolist()
+    y = list(y)
+    h = 0.5
+    for day, beta in enumerate(betas, 1):
+        t = 0.0
+        k = [None] * 7
+        k[0] = _rates_scalar(y, beta, gamma)
+        while t < 1.0:
+            step = min(h, 1.0 - t)
+            for stage in range(1, 7):
+                a = A[stage]
+                k[stage] = _rates_scalar(
+                    [y[c] + step * sum(a[j] * k[j][c] for j in range(stage)) for c in range(3)], beta, gamma
+                )
+            y_new = [y[c] + step * sum(B[j] * k[j][c] for j in range(6)) for c in range(3)]
+            norm = math.sqrt(sum(
+                (step * sum(E[j] * k[j][c] for j in range(7)) / (atol + rtol * max(abs(y[c]), abs(y_new[c])))) ** 2
+                for c in range(3)
+            ) / 3)
+            h = _next_step(h, step, norm)
+            if norm <= 1.0:
+                t += step
+                y = y_new
+                k[0] = k[6]
+        out[:, day] = y
+
+
+def _rates_scalar(y, beta, gamma):
+    infections = beta * y[0] * y[1]
+    recoveries = gamma * y[1]
+    return (-infections, infections - recoveries, recoveries)
+
+
+def sim_sir_ode(
+    S, I, R, beta, gamma, n_days, beta_decay=None, relative_contact_rates=None,
+    method: str = "rk4", steps_per_day: int = 4, rtol: float = 1e-6, atol: float = 1e-6,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Integrate one scenario; same inputs and outputs as models.sim_sir."""
+    betas = _daily_beta(beta, n_days, beta_decay, relative_contact_rates, 1)[0].tolist()
+    out = np.empty((3, n_days + 1))
+    out[:, 0] = S, I, R
+    if method == "rk4":
+        _rk4_scalar((float(S), float(I), float(R)), betas, float(gamma), steps_per_day, out)
+    elif method == "rk45":
+        _rk45_scalar((float(S), float(I), float(R)), betas, float(gamma), rtol, atol, out)
+    else:
+        raise ValueError("unknown method {!r}, expected rk4 or rk45".format(method))
+    np.maximum(out, 0, out=out)
+    return out[0], out[1], out[2]
@@ -0,0 +1,75 @@
+"""Parameters derived from the sidebar inputs."""
+
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+RECOVERY_DAYS = 14.0
+
+# sidebar defaults, with percentages as fractions
+DEFAULTS = {
+    "current_hosp": 4,
+    "doubling_time": 6.0,
+    "relative_contact_rate": 0.0,
+    "hosp_rate": 0.05,
+    "icu_rate": 0.02,
+    "vent_rate": 0.01,
+    "hosp_los": 7,
+    "icu_los": 9,
+    "vent_los": 10,
+    "market_share": 0.15,
+    "S": 4119405,
+    "n_days": 60,
+}
+
+
+class Parameters(NamedTuple):
+    total_infections: float
+    detection_prob: Optional[float]
+    gamma: float
+    intrinsic_growth_rate: float
+    beta: float
+    r_t: float
+    r_naught: float
+    doubling_time_t: float
+
+
+def get_beta(doubling_time, relative_contact_rate, S, gamma) -> float:
+    """Contact rate from {rate based on doubling time} / {initial S}, after distancing."""
+    intrinsic_growth_rate = 2 ** (1 / doubling_time) - 1
+    return (intrinsic_growth_rate + gamma) / S * (1 - relative_contact_rate)
+
+
+def derive_parameters(
+    current_hosp, doubling_time, relative_contact_rate, hosp_rate, market_share, S,
+    initial_infections=None, recovery_days=RECOVERY_DAYS,
+) -> Parameters:
+    """Derive the model parameters from what the user can estimate.
+
+    ``initial_infections`` only feeds the detection rate; leave it out when
+    that is not needed.
+    """
+    total_infections = current_hosp / market_share / hosp_rate
+    detection_prob = None
+    if initial_infections is not None:
+        detection_prob = initial_infections / total_infections
+
+    intrinsic_growth_rate = 2 ** (1 / doubling_time) - 1
+    # mean recovery rate, gamma, (in 1/days).
+    gamma = 1 / recovery_days
+    beta = get_beta(doubling_time, relative_contact_rate, S, gamma)
+
+    r_t = beta / gamma * S  # r_t is r_0 after distancing
+    r_naught = r_t / (1 - relative_contact_rate)
+    doubling_time_t = 1 / np.log2(beta * S - gamma + 1)  # doubling time after distancing
+
+    return Parameters(
+        total_infections=total_infections,
+        detection_prob=detection_prob,
+        gamma=gamma,
+        intrinsic_growth_rate=intrinsic_growth_rate,
+        beta=beta,
+        r_t=r_t,
+        r_naught=r_naught,
+        doubling_time_t=doubling_time_t,
+    )
@@ -0,0 +1,336 @@
+"""Admissions and census projections built on top of the SIR run.
+
+cached_projection evaluates the pipeline as three cached stages, each
+keyed on its own inputs only:
+
+    trajectory   I (from current_hosp, market_share and hosp_rate), doubling
+                 time, distancing, S, beta_decay, schedule and engine
+    admissions   the trajectory, n_days and the rates and market share
+    census       the admissions and the LOS
+
+so changing a LOS or the ICU or ventilator rate reuses the SIR run, and a
+longer n_days continues the longest run so far from its last day.
+"""
+
+from typing import NamedTuple, Tuple
+
+import numpy as np
+import pandas as pd
+
+from . import metrics
+from .cache import LRUCache
+from .census import census_from_admits, los_span
+from .models import sim_sir, sim_sir_batch
+from .ode import _daily_beta, get_ode_beta, sim_sir_ode, sim_sir_ode_batch
+from .parameters import RECOVERY_DAYS, get_beta
+from .schedules import contact_schedule
+
+
+CATEGORIES = ["hosp", "icu", "vent"]
+RESUMABLE = ("euler", "rk4")  # engines whose runs continue exactly from the last day
+
+
+class Projection(NamedTuple):
+    s: np.ndarray
+    i: np.ndarray
+    r: np.ndarray
+    projection: pd.DataFrame
+    r_projection: pd.DataFrame
+    projection_admits: pd.DataFrame
+    census_table: pd.DataFrame
+
+
+def build_admissions(i, r, hosp_rate, icu_rate, vent_rate, market_share) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """Split infections into patient categories and difference them into daily admissions.
+
+    Returns the (projection, r_projection, projection_admits) DataFrames.
+    """
+    hosp = i * hosp_rate * market_share
+    icu = i * icu_rate * market_share
+    vent = i * vent_rate * market_share
+
+    # Recovered
+    r_hosp = r * hosp_rate * market_share
+    r_icu = r * icu_rate * market_share
+    r_vent = r * vent_rate * market_share
+
+    return admissions_from_patients(hosp, icu, vent, r_hosp, r_icu, r_vent)
+
+
+def admissions_from_patients(hosp, icu, vent, r_hosp, r_icu, r_vent) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """build_admissions from the daily current and recovered patients of each category."""
+    days = np.array(range(0, len(hosp)))
+    data_dict = dict(zip(["day", "hosp", "icu", "vent"], [days, hosp, icu, vent]))
+    r_data_dict = dict(zip(["day", "hosp", "icu", "vent"], [days, r_hosp, r_icu, r_vent]))
+
+    projection = pd.DataFrame.from_dict(data_dict)
+    r_projection = pd.DataFrame.from_dict(r_data_dict)
+
+    # New cases
+    projection_admits = projection.iloc[:-1, :] - projection.shift(1)
+    r_projection_admits = r_projection.iloc[:-1, :] - r_projection.shift(1)
+
+    projection_admits = projection_admits + r_projection_admits
+    #projection_admits[projection_admits < 0] = 0
+    projection_admits["day"] = range(projection_admits.shape[0])
+
+    return projection, r_projection, projection_admits
+
+
+def daily_census(projection_admits, hosp_los, icu_los, vent_los) -> np.ndarray:
+    """(n_days + 1, categories) census behind build_census_table, NaN where a category can't see a full stay."""
+    los = [hosp_los, icu_los, vent_los]
+    census = np.ceil(census_from_admits(projection_admits[["hosp", "icu", "vent"]].to_numpy(), los))
+    n_days = census.shape[0]
+    for k, x in enumerate(los):
+        census[n_days - los_span(x):, k] = np.nan
+    return census
+
+
+def build_census_table(projection_admits, hosp_los, icu_los, vent_los) -> pd.DataFrame:
+    """ALOS for each category of COVID-19 case (total guesses)
+
+    Each LOS is a whole number of days or a LOS distribution, see
+    census.census_from_admits.
+    """
+    census = daily_census(projection_admits, hosp_los, icu_los, vent_los)
+    n_days = census.shape[0]
+
+    # weekly rows, starting from an empty census today
+    table = np.column_stack([np.arange(n_days), census])[::7]
+    table[0, :] = 0
+    table = table[~np.isnan(table).any(axis=1)]
+
+    census_table = pd.DataFrame(table.astype(np.int64), columns=["day", "hosp", "icu", "vent"])
+
+    return census_table
+
+
+def build_projection(
+    current_hosp, doubling_time, relative_contact_rate, hosp_rate, icu_rate, vent_rate,
+    hosp_los, icu_los, vent_los, market_share, S, n_days, beta_decay=0.0, schedule=(), engine="euler",
+) -> Projection:
+    """Run the SIR model and build the admissions and census tables from the raw inputs.
+
+    ``schedule`` lists ``(start_day, relative_contact_rate)`` changes in
+    distancing, see schedules.contact_schedule; relative_contact_rate holds
+    until the first of them. ``engine`` is one of ode.ENGINES.
+    """
+    I = current_hosp / market_share / hosp_rate  # total_infections
+    started = metrics.clock()
+    s, i, r = simulate(I, doubling_time, relative_contact_rate, S, n_days, beta_decay, schedule, engine)
+    metrics.record("sim_sir", started)
+
+    with metrics.timer("admissions"):
+        projection, r_projection, projection_admits = build_admissions(
+            i, r, hosp_rate, icu_rate, vent_rate, market_share
+        )
+    with metrics.timer("census_table"):
+        census_table = build_census_table(projection_admits, hosp_los, icu_los, vent_los)
+    metrics.scenarios("scalar", 1, metrics.clock() - started)
+
+    # cached results are shared between reruns and sessions, so keep them read-only
+    for arr in (s, i, r):
+        arr.flags.writeable = False
+
+    return Projection(s, i, r, projection, r_projection, projection_admits, census_table)
+
+
+def simulate(I, doubling_time, relative_contact_rate, S, n_days, beta_decay=0.0, schedule=(), engine="euler", start=None):
+    """The s, i, r arrays of build_projection's SIR run.
+
+    ``start`` is an earlier, shorter run of the same inputs to continue
+    from its last day; the result is the same as a run from day 0 for the
+    RESUMABLE engines.
+    """
+    gamma = 1 / RECOVERY_DAYS
+    if schedule:
+        contact, rates = 0.0, contact_schedule(schedule, n_days, initial=relative_contact_rate)
+    else:
+        contact, rates = relative_contact_rate, None
+    done = 0 if start is None else len(start[0]) - 1
+    y = (S, I, 0) if start is None else tuple(x[-1] for x in start)
+
+    if engine == "euler":
+        beta = get_beta(doubling_time, contact, S, gamma)
+        for _ in range(done if beta_decay else 0):
+            beta = beta * (1 - beta_decay)  # as sim_sir decays it day by day
+        tail = None if rates is None else rates[done:]
+        run = sim_sir(*y, beta, gamma, n_days - done, beta_decay=beta_decay, relative_contact_rates=tail, N=S + I + 0)
+    else:
+        beta = get_ode_beta(doubling_time, contact, S, gamma)
+        if start is None:
+            run = sim_sir_ode(*y, beta, gamma, n_days, beta_decay, rates, method=engine)
+        else:
+            betas = _daily_beta(beta, n_days, beta_decay, rates, 1)[:, done:]
+            run = sim_sir_ode(*y, betas, gamma, n_days - done, method=engine)
+    if start is None:
+        return run
+    return tuple(np.concatenate([before, after[1:]]) for before, after in zip(start, run))
+
+
+def projection_key(
+    current_hosp, doubling_time, relative_contact_rate, hosp_rate, icu_rate, vent_rate,
+    hosp_los, icu_los, vent_los, market_share, S, n_days, beta_decay=0.0, schedule=(), engine="euler",
+) -> Tuple:
+    """Normalize the model inputs into a hashable key, in build_projection argument order."""
+    return (
+        int(current_hosp), float(doubling_time), float(relative_contact_rate),
+        float(hosp_rate), float(icu_rate), float(vent_rate),
+        _los_key(hosp_los), _los_key(icu_los), _los_key(vent_los),
+        float(market_share), int(S), int(n_days), float(beta_decay),
+        tuple(sorted((int(day), float(rate)) for day, rate in schedule)), str(engine),
+    )
+
+
+class BatchProjection(NamedTuple):
+    s: np.ndarray  # (scenarios, n_days + 1)
+    i: np.ndarray
+    r: np.ndarray
+    admits: np.ndarray  # (scenarios, n_days + 1, categories)
+    census: np.ndarray  # (scenarios, n_days + 1, categories)
+
+
+def batch_admissions(i, r, hosp_rate, icu_rate, vent_rate, market_share) -> np.ndarray:
+    """build_admissions for (scenarios, n_days + 1) i and r arrays.
+
+    Returns (scenarios, n_days + 1, categories) daily admissions with the
+    same NaN first and last day as projection_admits.
+    """
+    rates = np.stack(np.broadcast_arrays(hosp_rate, icu_rate, vent_rate), axis=-1).reshape(-1, 1, 3)
+    share = np.reshape(market_share, (-1, 1, 1))
+    current = i[:, :, None] * rates * share
+    recovered = r[:, :, None] * rates * share
+
+    admits = np.full(current.shape, np.nan)
+    admits[:, 1:-1] = (current[:, 1:-1] - current[:, :-2]) + (recovered[:, 1:-1] - recovered[:, :-2])
+    return admits
+
+
+def batch_census(admits, hosp_los, icu_los, vent_los, mask_tail=True) -> np.ndarray:
+    """Daily census as shown in build_census_table, for a batch of scenarios.
+
+    The (whole day) LOS inputs may differ per scenario; scenarios sharing the same LOS
+    are computed together. Days without a full stay behind them are NaN
+    unless mask_tail is False.
+    """
+    los = np.stack(np.broadcast_arrays(hosp_los, icu_los, vent_los), axis=-1).reshape(-1, 3)
+    los = np.broadcast_to(los, (admits.shape[0], 3))
+    if (los != np.round(los)).any():
+        raise ValueError("batch LOS must be whole days")
+    los = los.astype(int)
+    n_days = admits.shape[1]
+
+    census = np.empty(admits.shape)
+    for group in np.unique(los, axis=0):
+        rows = (los == group).all(axis=1)
+        census[rows] = np.ceil(census_from_admits(admits[rows], group))
+        if mask_tail:
+            for k, x in enumerate(group):
+                census[rows, n_days - x:, k] = np.nan
+    census[:, 0] = 0
+    return census
+
+
+def build_projection_batch(
+    current_hosp, doubling_time, relative_contact_rate, hosp_rate, icu_rate, vent_rate,
+    hosp_los, icu_los, vent_los, market_share, S, n_days, beta_decay=0.0, mask_tail=True,
+    contact_rates=None, engine="euler",
+) -> BatchProjection:
+    """Vectorized build_projection.
+
+    Every input but n_days may be a scalar or a 1-d array with one entry per
+    scenario; the results match build_projection for each scenario.
+
+    ``contact_rates`` is an optional (scenarios, n_days) array of the contact
+    reduction on every day, e.g. from schedules.contact_schedules, used in
+    place of relative_contact_rate to compare many schedules in one run.
+    """
+    beta_for = get_beta if engine == "euler" else get_ode_beta
+    current_hosp, doubling_time, relative_contact_rate, hosp_rate, market_share, S = (
+        np.asarray(x, dtype=float)
+        for x in (current_hosp, doubling_time, relative_contact_rate, hosp_rate, market_share, S)
+    )
+    started = metrics.clock()
+    I = current_hosp / market_share / hosp_rate  # total_infections
+    gamma = 1 / RECOVERY_DAYS
+    if contact_rates is None:
+        beta = beta_for(doubling_time, relative_contact_rate, S, gamma)
+    else:
+        beta = np.reshape(beta_for(doubling_time, 0.0, S, gamma), (-1, 1)) * (1 - np.asarray(contact_rates))
+    if engine == "euler":
+        s, i, r = sim_sir_batch(S, I, 0, beta, gamma, n_days, beta_decay=beta_decay)
+    else:
+        s, i, r = sim_sir_ode_batch(S, I, 0, beta, gamma, n_days, beta_decay, method=engine)
+
+    admits = batch_admissions(i, r, hosp_rate, icu_rate, vent_rate, market_share)
+    census = batch_census(admits, hosp_los, icu_los, vent_los, mask_tail=mask_tail)
+    metrics.scenarios("batch", s.shape[0], metrics.clock() - started)
+    return BatchProjection(s, i, r, admits, census)
+
+
+def _los_key(los):
+    if np.ndim(los) == 0:
+        return int(los)
+    return tuple(float(x) for x in los)
+
+
+# one cache per process, shared by every rerun and session
+projection_cache = LRUCache(maxsize=256)
+metrics.register_cache("projection", projection_cache)
+
+
+# the stages of cached_projection, see the module docstring
+trajectory_cache = LRUCache(maxsize=64)  # longest run so far per upstream input
+admissions_cache = LRUCache(maxsize=256)
+census_cache = LRUCache(maxsize=256)
+metrics.register_cache("trajectory", trajectory_cache)
+metrics.register_cache("admissions", admissions_cache)
+metrics.register_cache("census", census_cache)
+
+
+def cached_trajectory(I, doubling_time, relative_contact_rate, S, n_days, beta_decay=0.0, schedule=(), engine="euler"):
+    """simulate, reusing or continuing the longest cached run of the same inputs."""
+    key = (float(I), float(doubling_time), float(relative_contact_rate), int(S), float(beta_decay),
+           tuple(schedule), str(engine))
+    run = trajectory_cache.lookup(key)
+    if run is None or len(run[0]) <= n_days:
+        start = run if engine in RESUMABLE else None
+        started = metrics.clock()
+        run = simulate(I, doubling_time, relative_contact_rate, S, n_days, beta_decay, schedule, engine, start)
+        metrics.record("sim_sir", started)
+        metrics.scenarios("scalar", 1, metrics.clock() - started)
+        for arr in run:
+            arr.flags.writeable = False
+        trajectory_cache.put(key, run)
+    return tuple(x[:n_days + 1] for x in run)
+
+
+def incremental_projection(
+    current_hosp, doubling_time, relative_contact_rate, hosp_rate, icu_rate, vent_rate,
+    hosp_los, icu_los, vent_los, market_share, S, n_days, beta_decay=0.0, schedule=(), engine="euler",
+) -> Projection:
+    """build_projection, recomputing only the stages whose inputs changed."""
+    I = current_hosp / market_share / hosp_rate  # total_infections
+    upstream = (I, doubling_time, relative_contact_rate, S, n_days, beta_decay, schedule, engine)
+    s, i, r = cached_trajectory(*upstream)
+
+    def admissions():
+        with metrics.timer("admissions"):
+            return build_admissions(i, r, hosp_rate, icu_rate, vent_rate, market_share)
+
+    admissions_key = upstream + (hosp_rate, icu_rate, vent_rate, market_share)
+    projection, r_projection, projection_admits = admissions_cache.get(admissions_key, admissions)
+
+    def census():
+        with metrics.timer("census_table"):
+            return build_census_table(projection_admits, hosp_los, icu_los, vent_los)
+
+    census_table = census_cache.get(admissions_key + (hosp_los, icu_los, vent_los), census)
+    return Projection(s, i, r, projection, r_projection, projection_admits, census_table)
+
+
+def cached_projection(*args, **kwargs) -> Projection:
+    """build_projection, memoized on the normalized inputs and evaluated stage by stage."""
+    key = projection_key(*args, **kwargs)
+    return projection_cache.get(key, lambda: incremental_projection(*key))
@@ -0,0 +1,199 @@
+"""Multi-county, multi-facility projections.
+
+Every county runs its own SIR curve, all counties at once through
+sim_sir_batch. Infections are then split between the facilities with one
+county-by-facility market share matrix multiply, and each facility's
+admissions and census are built from its share::
+
+    regions = parse_regions('''
+        county,population,Main,North
+        washoe,486492,0.45,0.10
+        carson,58639,0.20,0.05
+    ''')
+    result = build_regional_projection(regions, current_hosp=40, n_days=90)
+    result.census  # (facilities, n_days + 1, categories)
+    result.system_census  # summed over facilities
+
+The sidebar inputs other than the market share and population apply to
+every county.
+"""
+
+from typing import List, NamedTuple, Optional
+import io
+
+import numpy as np
+import pandas as pd
+
+from . import metrics
+from .cache import LRUCache
+from .models import sim_sir_batch
+from .ode import get_ode_beta, sim_sir_ode_batch
+from .parameters import DEFAULTS, RECOVERY_DAYS, get_beta
+from .projections import CATEGORIES, batch_admissions, batch_census
+from .schedules import contact_schedule
+
+# catchment area populations of the default region
+COUNTIES = {
+    "delaware": 564696,
+    "chester": 519293,
+    "montgomery": 826075,
+    "bucks": 628341,
+    "philly": 1581000,
+}
+S_DEFAULT = sum(COUNTIES.values())
+
+
+class Regions(NamedTuple):
+    counties: List[str]
+    populations: np.ndarray  # (counties,)
+    facilities: List[str]
+    market_shares: np.ndarray  # (counties, facilities)
+
+
+class RegionalProjection(NamedTuple):
+    regions: Regions
+    s: np.ndarray  # (counties, n_days + 1)
+    i: np.ndarray
+    r: np.ndarray
+    admits: np.ndarray  # (facilities, n_days + 1, categories)
+    census: np.ndarray  # (facilities, n_days + 1, categories)
+    system_census: np.ndarray  # (n_days + 1, categories)
+
+
+def default_regions(market_share: float = DEFAULTS["market_share"], facility: str = "Hospital") -> Regions:
+    """The default counties, all served by one facility with the given share."""
+    return Regions(
+        counties=list(COUNTIES),
+        populations=np.array(list(COUNTIES.values()), dtype=float),
+        facilities=[facility],
+        market_shares=np.full((len(COUNTIES), 1), float(market_share)),
+    )
+
+
+def parse_regions(text: str) -> Regions:
+    """CSV with a ``county,population`` column pair and one market share column per facility."""
+    try:
+        frame = pd.read_csv(io.StringIO(text.strip()), skipinitialspace=True)
+    except (ValueError, pd.errors.ParserError):
+        raise ValueError("regions must be CSV with county, population and facility columns")
+    columns = [str(c).strip() for c in frame.columns]
+    if columns[:2] != ["county", "population"] or len(columns) < 3:
+        raise ValueError("regions CSV must start with county,population followed by facility columns")
+    regions = Regions(
+        counties=[str(c).strip() for c in frame.iloc[:, 0]],
+        populations=pd.to_numeric(frame.iloc[:, 1], errors="coerce").to_numpy(dtype=float),
+        facilities=columns[2:],
+        market_shares=frame.iloc[:, 2:].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=float),
+    )
+    check_regions(regions)
+    return regions
+
+
+def check_regions(regions: Regions):
+    populations, shares = regions.populations, regions.market_shares
+    if not len(populations) or not np.isfinite(populations).all() or (populations <= 0).any():
+        raise ValueError("every county needs a positive population")
+    if shares.shape != (len(populations), len(regions.facilities)):
+        raise ValueError("market shares must have one row per county and one column per facility")
+    if not np.isfinite(shares).all() or (shares < 0).any():
+        raise ValueError("market shares must be non-negative numbers")
+    if (shares.sum(axis=1) > 1 + 1e-9).any():
+        raise ValueError("a county's market shares can't add up to more than 100%")
+    if shares.sum() == 0:
+        raise ValueError("at least one facility needs a market share")
+
+
+def build_regional_projection(
+    regions: Regions,
+    current_hosp: float = DEFAULTS["current_hosp"],
+    doubling_time=DEFAULTS["doubling_time"],
+    relative_contact_rate=DEFAULTS["relative_contact_rate"],
+    hosp_rate: float = DEFAULTS["hosp_rate"],
+    icu_rate: float = DEFAULTS["icu_rate"],
+    vent_rate: float = DEFAULTS["vent_rate"],
+    hosp_los: int = DEFAULTS["hosp_los"],
+    icu_los: int = DEFAULTS["icu_los"],
+    vent_los: int = DEFAULTS["vent_los"],
+    n_days: int = DEFAULTS["n_days"],
+    contact_rates: Optional[np.ndarray] = None,
+    engine: str = "euler",
+) -> RegionalProjection:
+    """Per-facility and system-wide projections for a set of counties.
+
+    current_hosp is the number of patients across all facilities today;
+    the infections it implies are spread over the counties by population.
+    doubling_time and relative_contact_rate may be per county, and
+    contact_rates an (n_days,) or (counties, n_days) schedule, see
+    build_projection_batch. ``engine`` is one of ode.ENGINES.
+    """
+    check_regions(regions)
+    populations, shares = regions.populations, regions.market_shares
+
+    # patients today = total infections * hosp_rate * population weighted system share
+    system_share = populations @ shares.sum(axis=1) / populations.sum()
+    I = current_hosp / system_share / hosp_rate * populations / populations.sum()
+
+    gamma = 1 / RECOVERY_DAYS
+    beta_for = get_beta if engine == "euler" else get_ode_beta
+    if contact_rates is None:
+        beta = beta_for(np.asarray(doubling_time, dtype=float), relative_contact_rate, populations, gamma)
+    else:
+        beta = beta_for(np.asarray(doubling_time, dtype=float), 0.0, populations, gamma)[:, None]
+        beta = beta * (1 - np.broadcast_to(contact_rates, (len(populations), n_days)))
+    if engine == "euler":
+        s, i, r = sim_sir_batch(populations, I, 0, beta, gamma, n_days)
+    else:
+        s, i, r = sim_sir_ode_batch(populations, I, 0, beta, gamma, n_days, method=engine)
+
+    # infected and recovered patients each facility would see, all counties at once
+    facility_i, facility_r = np.einsum("cf,xcd->xfd", shares, np.stack([i, r]))
+    admits = batch_admissions(facility_i, facility_r, hosp_rate, icu_rate, vent_rate, 1.0)
+    census = batch_census(admits, hosp_los, icu_los, vent_los)
+    return RegionalProjection(regions, s, i, r, admits, census, census.sum(axis=0))
+
+
+def regional_census_frame(projection: RegionalProjection, every: int = 1) -> pd.DataFrame:
+    """Long-format census, one row per facility and day plus a "System" total."""
+    census = np.concatenate([projection.census, projection.system_census[None]])
+    names = projection.regions.facilities + ["System"]
+    n_days = census.shape[1]
+    days = np.arange(0, n_days, every)
+    frame = pd.DataFrame({
+        "day": np.tile(days, len(names)),
+        "facility": np.repeat(names, len(days)),
+        **{category: census[:, ::every, k].ravel() for k, category in enumerate(CATEGORIES)},
+    })
+    return frame.dropna().astype({category: np.int64 for category in CATEGORIES}).reset_index(drop=True)
+
+
+def regions_key(regions: Regions) -> tuple:
+    return (
+        tuple(regions.counties), tuple(regions.populations.tolist()),
+        tuple(regions.facilities), tuple(map(tuple, regions.market_shares.tolist())),
+    )
+
+
+# county-by-facility runs, keyed on the regions table and the shared inputs
+regional_cache = LRUCache(maxsize=64)
+metrics.register_cache("regional", regional_cache)
+
+
+def cached_regional_projection(regions: Regions, schedule=(), **inputs) -> RegionalProjection:
+    """build_regional_projection, memoized on the regions, scalar inputs and distancing schedule.
+
+    ``schedule`` holds ``(day, rate)`` segments, see schedules.contact_schedule,
+    starting from relative_contact_rate.
+    """
+    schedule = tuple(map(tuple, schedule))
+    key = (regions_key(regions), schedule, tuple(sorted(inputs.items())))
+
+    def run():
+        contact_rates = None
+        if schedule:
+            contact_rates = contact_schedule(
+                schedule, inputs.get("n_days", DEFAULTS["n_days"]),
+                initial=inputs.get("relative_contact_rate", DEFAULTS["relative_contact_rate"]),
+            )
+        return build_regional_projection(regions, contact_rates=contact_rates, **inputs)
+
+    return regional_cache.get(key, run)
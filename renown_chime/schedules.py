@@ -0,0 +1,50 @@
+"""Piecewise-constant social distancing schedules.
+
+A schedule is a list of ``(start_day, relative_contact_rate)`` segments;
+each reduction holds from its start day until the next segment starts::
+
+    [(0, 0.0), (14, 0.3), (45, 0.1)]   # distancing from day 14, relaxed on day 45
+
+or, as typed in the sidebar with percentages, ``0:0, 14:30, 45:10``.
+"""
+
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+Schedule = List[Tuple[int, float]]
+
+
+def parse_schedule(text: str) -> Schedule:
+    """``day:percent`` pairs separated by commas."""
+    segments = []
+    for part in text.replace(";", ",").split(","):
+        if not part.strip():
+            continue
+        day, sep, percent = part.partition(":")
+        try:
+            segment = (int(day), float(percent) / 100.0)
+        except ValueError:
+            sep = ""
+        if not sep or segment[0] < 0 or not 0 <= segment[1] < 1:
+            raise ValueError("expected day:percent with a reduction below 100%, got {!r}".format(part.strip()))
+        segments.append(segment)
+    return sorted(segments)
+
+
+def contact_schedule(segments: Sequence[Tuple[int, float]], n_days: int, initial=0.0) -> np.ndarray:
+    """Contact reduction on each of n_days; ``initial`` holds until the first segment.
+
+    ``initial`` may also hold one value per scenario, for a (scenarios,
+    n_days) array of the same schedule from each scenario's own start.
+    """
+    initial = np.asarray(initial, dtype=float)
+    rates = np.repeat(initial[..., None], n_days, axis=-1)
+    for day, rate in sorted(segments):
+        rates[..., min(day, n_days):] = rate
+    return rates
+
+
+def contact_schedules(schedules: Sequence[Sequence[Tuple[int, float]]], n_days: int, initial: float = 0.0) -> np.ndarray:
+    """(schedules, n_days) contact reductions, one row per candidate schedule."""
+    return np.stack([contact_schedule(s, n_days, initial) for s in schedules])
@@ -0,0 +1,105 @@
+"""One-at-a-time sensitivity of the peak census to every model input.
+
+Every input is moved down and up from the baseline, one at a time, and all
+the resulting scenarios run as one batch::
+
+    result = sensitivity(dict(DEFAULTS), n_days=120)
+    result.table  # input, side, value, peak_hosp, day_hosp, ...
+
+Moves are relative (20% by default) except for social distancing, which
+moves by ten percentage points, and whole-day inputs are rounded. A
+distancing ``schedule`` applies to every scenario, starting from that
+scenario's relative_contact_rate.
+"""
+
+from typing import Dict, NamedTuple, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from . import metrics
+from .cache import LRUCache
+from .ensemble import BOUNDS, WHOLE
+from .parameters import DEFAULTS
+from .projections import CATEGORIES, build_projection_batch
+from .schedules import contact_schedule
+
+INPUTS = [name for name in DEFAULTS if name != "n_days"]
+ABSOLUTE = {"relative_contact_rate": 0.1}  # moved by this much rather than a fraction of the baseline
+
+
+class Sensitivity(NamedTuple):
+    baseline: Dict[str, float]  # peak_<category> and day_<category> of the baseline
+    table: pd.DataFrame  # one row per input and side, "low" or "high"
+
+
+def perturbations(baseline: Dict[str, float], spread: float = 0.2) -> pd.DataFrame:
+    """The baseline followed by a low and a high scenario for every input."""
+    rows = [dict(baseline, input=None, side="baseline", value=np.nan)]
+    for name in INPUTS:
+        move = ABSOLUTE.get(name, spread * baseline[name])
+        low, high = BOUNDS[name]
+        for side, value in (("low", baseline[name] - move), ("high", baseline[name] + move)):
+            value = min(max(value, low), high if high is not None else np.inf)
+            value = round(value) if name in WHOLE else value
+            rows.append(dict(baseline, input=name, side=side, value=value, **{name: value}))
+    return pd.DataFrame(rows)
+
+
+def sensitivity(
+    baseline: Dict[str, float],
+    n_days: int,
+    spread: float = 0.2,
+    engine: str = "euler",
+    schedule: Sequence[Tuple[int, float]] = (),
+) -> Sensitivity:
+    """Peak census and day of peak for every perturbation, in one batched run."""
+    baseline = {name: baseline[name] for name in INPUTS}
+    scenarios = perturbations(baseline, spread)
+    contact_rates = None
+    if schedule:
+        contact_rates = contact_schedule(schedule, n_days, scenarios["relative_contact_rate"].to_numpy())
+    with metrics.timer("sensitivity"):
+        result = build_projection_batch(
+            **{name: scenarios[name].to_numpy() for name in INPUTS}, n_days=n_days, contact_rates=contact_rates,
+            engine=engine,
+        )
+
+    census = result.census
+    table = scenarios[["input", "side", "value"]].copy()
+    for k, category in enumerate(CATEGORIES):
+        table["peak_" + category] = np.nanmax(census[:, :, k], axis=1)
+        table["day_" + category] = np.nanargmax(census[:, :, k], axis=1)
+
+    first = table.iloc[0]
+    peaks = {column: first[column] for column in table.columns if column.startswith(("peak_", "day_"))}
+    return Sensitivity(peaks, table.iloc[1:].reset_index(drop=True))
+
+
+def tornado(result: Sensitivity, category: str = "hosp") -> pd.DataFrame:
+    """Low and high peak census of a category per input, widest swing first."""
+    table = result.table.pivot(index="input", columns="side", values=["value", "peak_" + category, "day_" + category])
+    table.columns = ["{}_{}".format(column, side) for column, side in table.columns]
+    table = table.reset_index()
+    table["swing"] = (table["peak_{}_high".format(category)] - table["peak_{}_low".format(category)]).abs()
+    return table.sort_values("swing", ascending=False, kind="stable").reset_index(drop=True)
+
+
+# tornado tables per baseline, horizon, engine and distancing schedule
+sensitivity_cache = LRUCache(maxsize=64)
+metrics.register_cache("sensitivity", sensitivity_cache)
+
+
+def cached_sensitivity(
+    baseline: Dict[str, float],
+    n_days: int,
+    spread: float = 0.2,
+    engine: str = "euler",
+    schedule: Sequence[Tuple[int, float]] = (),
+) -> Sensitivity:
+    """sensitivity, memoized per baseline and schedule."""
+    schedule = tuple((int(day), float(rate)) for day, rate in schedule)
+    key = (
+        tuple((name, float(baseline[name])) for name in INPUTS), int(n_days), float(spread), str(engine), schedule,
+    )
+    return sensitivity_cache.get(key, lambda: sensitivity(baseline, n_days, spread, engine, schedule))
@@ -0,0 +1,190 @@
+"""Named scenarios saved to a local SQLite file.
+
+Each run is stored once, keyed by a hash of its normalized inputs, with its
+SIR trajectory and daily census as zlib-compressed .npy blobs; names point
+at runs, so saving the same inputs twice, from any replica sharing the
+file, keeps one copy::
+
+    store = ScenarioStore()  # $CHIME_STORE, or scenarios.sqlite
+    store.save("baseline", dict(DEFAULTS, n_days=120))
+    snapshot = store.load("baseline")  # no simulation
+    diff([snapshot, store.load("lockdown")])
+
+Loading rebuilds the projection tables, admissions included, from the
+stored trajectory, which takes milliseconds.
+"""
+
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
+import contextlib
+import hashlib
+import inspect
+import io
+import json
+import os
+import sqlite3
+import time
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from .projections import (
+    CATEGORIES, Projection, build_admissions, build_census_table, build_projection, cached_projection,
+    daily_census, projection_key,
+)
+
+DEFAULT_PATH = "scenarios.sqlite"
+
+# build_projection arguments, in order
+INPUTS = list(inspect.signature(build_projection).parameters)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    input_hash TEXT NOT NULL,
+    inputs TEXT NOT NULL,
+    sir BLOB NOT NULL,
+    census BLOB NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS runs_input_hash ON runs (input_hash);
+CREATE TABLE IF NOT EXISTS scenarios (
+    name TEXT PRIMARY KEY,
+    input_hash TEXT NOT NULL,
+    saved REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS scenarios_input_hash ON scenarios (input_hash);
+"""
+
+
+class Snapshot(NamedTuple):
+    name: str
+    inputs: Dict[str, Any]  # build_projection arguments
+    input_hash: str
+    saved: float  # seconds since the epoch
+    projection: Projection
+    census: np.ndarray  # (n_days + 1, categories) daily census, see projections.daily_census
+
+
+def normalize_inputs(inputs: Dict[str, Any]) -> Dict[str, Any]:
+    """build_projection arguments as projection_key normalizes them, by name."""
+    return dict(zip(INPUTS, projection_key(**inputs)))
+
+
+def input_hash(inputs: Dict[str, Any]) -> str:
+    """Stable hash of the normalized inputs, the same on every replica."""
+    text = json.dumps(normalize_inputs(inputs), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def pack(array: np.ndarray) -> bytes:
+    buffer = io.BytesIO()
+    np.save(buffer, np.ascontiguousarray(array), allow_pickle=False)
+    return zlib.compress(buffer.getvalue())
+
+
+def unpack(blob: bytes) -> np.ndarray:
+    return np.load(io.BytesIO(zlib.decompress(blob)), allow_pickle=False)
+
+
+def _decode_inputs(text: str) -> Dict[str, Any]:
+    inputs = json.loads(text)
+    # JSON has no tuples; LOS distributions and schedules come back as lists
+    return {
+        name: tuple(map(tuple, inputs[name])) if name == "schedule"
+        else tuple(inputs[name]) if isinstance(inputs[name], list) else inputs[name]
+        for name in INPUTS
+    }
+
+
+class ScenarioStore:
+    """Named scenarios in a SQLite file; safe to share between threads and processes."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.environ.get("CHIME_STORE", DEFAULT_PATH)
+        with self._connect() as db:
+            db.executescript(SCHEMA)
+
+    @contextlib.contextmanager
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=30)
+        try:
+            with db:  # one transaction
+                yield db
+        finally:
+            db.close()
+
+    def save(self, name: str, inputs: Dict[str, Any], projection: Optional[Projection] = None) -> str:
+        """Save the run of these inputs under name, replacing any scenario of that name.
+
+        The run is only simulated (or taken from ``projection``) when no
+        scenario with the same inputs has been saved before. Returns the
+        input hash.
+        """
+        if not name.strip():
+            raise ValueError("a scenario needs a name")
+        inputs = normalize_inputs(inputs)
+        digest = input_hash(inputs)
+        with self._connect() as db:
+            if db.execute("SELECT 1 FROM runs WHERE input_hash = ?", (digest,)).fetchone() is None:
+                projection = projection or cached_projection(**inputs)
+                census = daily_census(
+                    projection.projection_admits, inputs["hosp_los"], inputs["icu_los"], inputs["vent_los"]
+                )
+                sir = np.stack([projection.s, projection.i, projection.r])
+                db.execute("INSERT OR IGNORE INTO runs VALUES (?, ?, ?, ?)", (
+                    digest, json.dumps(inputs, sort_keys=True), pack(sir), pack(census),
+                ))
+            db.execute("INSERT OR REPLACE INTO scenarios VALUES (?, ?, ?)", (name.strip(), digest, time.time()))
+        return digest
+
+    def names(self) -> List[str]:
+        """Saved scenario names, most recent first."""
+        with self._connect() as db:
+            return [row[0] for row in db.execute("SELECT name FROM scenarios ORDER BY saved DESC, name")]
+
+    def load(self, name: str) -> Snapshot:
+        """A saved scenario with its projection, without simulating."""
+        with self._connect() as db:
+            row = db.execute(
+                "SELECT name, input_hash, saved, inputs, sir, census FROM scenarios JOIN runs USING (input_hash) "
+                "WHERE name = ?", (name,),
+            ).fetchone()
+        if row is None:
+            raise KeyError(name)
+        name, digest, saved, text, sir, census = row
+        inputs = _decode_inputs(text)
+        s, i, r = unpack(sir)
+        for arr in (s, i, r):
+            arr.flags.writeable = False
+        projection, r_projection, projection_admits = build_admissions(
+            i, r, inputs["hosp_rate"], inputs["icu_rate"], inputs["vent_rate"], inputs["market_share"]
+        )
+        census_table = build_census_table(projection_admits, inputs["hosp_los"], inputs["icu_los"], inputs["vent_los"])
+        projection = Projection(s, i, r, projection, r_projection, projection_admits, census_table)
+        return Snapshot(name, inputs, digest, saved, projection, unpack(census))
+
+    def delete(self, name: str):
+        """Remove a scenario, and its run when no other scenario shares it."""
+        with self._connect() as db:
+            db.execute("DELETE FROM scenarios WHERE name = ?", (name,))
+            db.execute("DELETE FROM runs WHERE input_hash NOT IN (SELECT input_hash FROM scenarios)")
+
+
+def diff(snapshots: Sequence[Snapshot]) -> pd.DataFrame:
+    """Inputs that differ, then peak census and day of peak, one column per scenario."""
+    rows = {}
+    for name in INPUTS:
+        values = [snapshot.inputs[name] for snapshot in snapshots]
+        if any(value != values[0] for value in values):
+            rows[name] = values
+    for k, category in enumerate(CATEGORIES):
+        rows["peak_" + category] = [np.nanmax(snapshot.census[:, k]) for snapshot in snapshots]
+        rows["day_" + category] = [int(np.nanargmax(snapshot.census[:, k])) for snapshot in snapshots]
+    return pd.DataFrame.from_dict(rows, orient="index", columns=[s.name for s in snapshots], dtype=object)
+
+
+def stack_census(snapshots: Sequence[Snapshot]) -> np.ndarray:
+    """(scenarios, days, categories) daily census, NaN past a scenario's horizon."""
+    census = np.full((len(snapshots), max(len(s.census) for s in snapshots), len(CATEGORIES)), np.nan)
+    for k, snapshot in enumerate(snapshots):
+        census[k, :len(snapshot.census)] = snapshot.census
+    return census
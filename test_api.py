@@ -0,0 +1,97 @@
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import json
+import threading
+
+import pytest
+
+from renown_chime import api
+from renown_chime.parameters import DEFAULTS
+
+
+def test_parse_inputs_fills_defaults_and_validates():
+    inputs = api.parse_inputs({"doubling_time": 4, "n_days": 30})
+    assert inputs["doubling_time"] == 4.0
+    assert inputs["hosp_los"] == DEFAULTS["hosp_los"]
+
+    assert inputs["schedule"] == () and inputs["engine"] == "euler"
+
+    inputs = api.parse_inputs({"schedule": [[45, 0.1], [14, 0.3]], "engine": "rk4"})
+    assert inputs["schedule"] == ((14, 0.3), (45, 0.1))
+    assert inputs["engine"] == "rk4"
+
+    for bad in [
+        {"doubling_time": -1}, {"hosp_los": 2.5}, {"bogus": 1}, {"S": "many"}, [],
+        {"schedule": "14:30"}, {"schedule": [[14]]}, {"schedule": [[-1, 0.3]]}, {"schedule": [[14, 1.0]]},
+        {"schedule": [[1.5, 0.3]]}, {"engine": "rk2"},
+    ]:
+        with pytest.raises(ValueError):
+            api.parse_inputs(bad)
+
+
+def test_service_caches_and_shares_concurrent_requests(monkeypatch):
+    calls = []
+    original = api.projection_body
+
+    def projection_body(key):
+        calls.append(key)
+        return original(key)
+
+    monkeypatch.setattr(api, "projection_body", projection_body)
+
+    async def scenario():
+        service = api.ProjectionService(ThreadPoolExecutor(2), max_pending=2)
+        inputs = api.parse_inputs({"n_days": 30})
+        bodies = await asyncio.gather(*[service.projection(inputs) for _ in range(10)])
+        bodies.append(await service.projection(inputs))
+        return service, bodies
+
+    service, bodies = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert len(set(bodies)) == 1
+    assert service.cache.hits == 1
+
+    body = json.loads(bodies[0])
+    assert body["inputs"]["n_days"] == 30
+    assert len(body["admissions"]["hosp"]) == 31
+    assert body["admissions"]["hosp"][0] is None
+    assert body["census"]["day"][:2] == [0, 7]
+
+
+def test_cancelled_caller_does_not_fail_the_others(monkeypatch):
+    release = threading.Event()
+    original = api.projection_body
+
+    def projection_body(key):
+        release.wait(10)
+        return original(key)
+
+    monkeypatch.setattr(api, "projection_body", projection_body)
+
+    async def scenario():
+        service = api.ProjectionService(ThreadPoolExecutor(2))
+        inputs = api.parse_inputs({"n_days": 30})
+        first = asyncio.ensure_future(service.projection(inputs))
+        second = asyncio.ensure_future(service.projection(inputs))
+        await asyncio.sleep(0.05)  # both waiting on the one computation
+        first.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        body = await second
+        assert first.cancelled()
+        assert service.cache.lookup(api.projection_key(**inputs)) == body
+        assert not service._inflight
+        return body
+
+    body = json.loads(asyncio.run(scenario()))
+    assert body["inputs"]["n_days"] == 30
+
+
+def test_projection_body_follows_schedule_and_engine(default_key):
+    inputs = api.parse_inputs({"n_days": 90, "schedule": [[14, 0.3]], "engine": "rk4"})
+    key = api.projection_key(**inputs)
+    assert key == default_key(n_days=90, schedule=[(14, 0.3)], engine="rk4")
+    body = json.loads(api.projection_body(key))
+    assert body["inputs"]["schedule"] == [[14, 0.3]] and body["inputs"]["engine"] == "rk4"
+    expected = api.build_projection(*key).census_table
+    assert body["census"]["hosp"] == expected["hosp"].tolist()
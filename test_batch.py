@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from renown_chime.batch import main, parse_values, run_chunk
+from renown_chime.projections import build_projection
+
+
+def test_parse_values():
+    assert parse_values("3:5:0.5") == [3.0, 3.5, 4.0, 4.5, 5.0]
+    assert parse_values("0,0.25") == [0.0, 0.25]
+
+
+def test_run_chunk_matches_build_projection(default_key):
+    scenarios = pd.DataFrame({"doubling_time": [4.0, 8.0], "hosp_los": [5, 9], "market_share": [0.15, 0.3]})
+    frame = run_chunk(scenarios, 60, first_id=10)
+    assert list(frame["scenario"].unique()) == [10, 11]
+
+    for row, (_, scenario) in zip((10, 11), scenarios.iterrows()):
+        projection = build_projection(*default_key(
+            doubling_time=scenario.doubling_time, hosp_los=scenario.hosp_los, market_share=scenario.market_share,
+        ))
+        daily = frame[frame["scenario"] == row]
+        np.testing.assert_array_equal(
+            daily[["admits_hosp", "admits_icu", "admits_vent"]].to_numpy(),
+            projection.projection_admits[["hosp", "icu", "vent"]].to_numpy(),
+        )
+        weekly = daily[["census_hosp", "census_icu", "census_vent"]].to_numpy()[::7]
+        table = projection.census_table[["hosp", "icu", "vent"]].to_numpy()
+        np.testing.assert_array_equal(weekly[: len(table)], table)
+
+
+def test_main_streams_grid_to_csv(tmp_path):
+    out = tmp_path / "out.csv"
+    main([str(out), "--grid", "doubling_time=4:6:1", "--grid", "hosp_los=5,7",
+          "--n-days", "30", "--chunk-size", "4", "--workers", "1", "--quiet"])
+    frame = pd.read_csv(out)
+    assert frame["scenario"].nunique() == 6
+    assert len(frame) == 6 * 31
+
+
+def test_parquet_chunks_share_one_schema(tmp_path):
+    scenarios = tmp_path / "scenarios.csv"
+    pd.DataFrame({"doubling_time": [4, 5, 6.5, 7], "market_share": [0.1, 0.15, 0.2, 0.25]}).to_csv(scenarios, index=False)
+    out = tmp_path / "out.parquet"
+    main([str(out), "--scenarios", str(scenarios), "--n-days", "20", "--chunk-size", "1", "--workers", "2", "--quiet"])
+    frame = pd.read_parquet(out)
+    assert frame["scenario"].nunique() == 4
+    assert frame["hosp_los"].dtype == np.float64
+
+
+def test_fractional_los_is_a_usage_error(tmp_path, capsys):
+    scenarios = tmp_path / "scenarios.csv"
+    pd.DataFrame({"hosp_los": [7, 10.5]}).to_csv(scenarios, index=False)
+    for source in (["--scenarios", str(scenarios)], ["--grid", "icu_los=8,9.5"]):
+        with pytest.raises(SystemExit) as exit:
+            main([str(tmp_path / "out.csv"), *source, "--workers", "1", "--quiet"])
+        assert exit.value.code == 2
+        assert "whole number of days" in capsys.readouterr().err
+
+
+def test_bad_scenario_row_writes_no_output(tmp_path, capsys):
+    scenarios = tmp_path / "scenarios.csv"
+    scenarios.write_text("doubling_time,hosp_los\n4,7\n5,7\n6,\n")
+    out = tmp_path / "out.csv"
+    with pytest.raises(SystemExit):
+        main([str(out), "--scenarios", str(scenarios), "--chunk-size", "1", "--workers", "1", "--quiet"])
+    assert "hosp_los must hold a number" in capsys.readouterr().err
+    assert not out.exists()
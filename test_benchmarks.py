@@ -0,0 +1,18 @@
+from benchmarks.bench import compare, measure
+
+
+def test_compare_flags_slowdowns_over_tolerance():
+    baseline = {"results": {"fast": {"seconds": 1.0}, "slow": {"seconds": 1.0}}}
+    results = {"results": {"fast": {"seconds": 1.1}, "slow": {"seconds": 2.0}, "new": {"seconds": 5.0}}}
+    report = compare(results, baseline, tolerance=1.5)
+    assert set(report) == {"fast", "slow", "new"}
+    assert report["new"]["missing"] and report["new"]["ratio"] is None
+    assert not report["fast"]["regressed"] and not report["fast"]["missing"]
+    assert report["slow"]["regressed"]
+    assert report["slow"]["ratio"] == 2.0
+
+
+def test_measure_reports_seconds_per_call():
+    result = measure(lambda: None, repeat=2)
+    assert 0 < result["seconds"] <= result["median"]
+    assert result["loops"] >= 1
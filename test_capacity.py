@@ -0,0 +1,35 @@
+import numpy as np
+
+from renown_chime.capacity import capacity_report, capacity_table, exceedance_probability
+from renown_chime.ensemble import parse_distribution, run_ensemble
+
+
+def test_capacity_report_matches_day_by_day_loop():
+    rng = np.random.default_rng(3)
+    census = rng.integers(0, 60, size=(20, 50, 3)).astype(float)
+    census[:, -5:, 2] = np.nan
+    capacity = [45, 50, 58]
+    report = capacity_report(census, capacity)
+
+    for n in range(census.shape[0]):
+        for k in range(3):
+            days = [d for d in range(census.shape[1]) if census[n, d, k] > capacity[k]]
+            excess = [census[n, d, k] - capacity[k] for d in days]
+            assert report.first_exceeded[n, k] == (days[0] if days else -1)
+            assert report.overflow_days[n, k] == sum(excess)
+            assert report.peak_shortfall[n, k] == max(excess, default=0)
+
+    table = capacity_table(capacity_report(census[0], capacity), capacity)
+    assert list(table["first_day_over"].isna()) == list(report.first_exceeded[0] < 0)
+
+
+def test_ensemble_exceedance_probability():
+    distributions = {"doubling_time": parse_distribution("uniform:3,9")}
+    result = run_ensemble(distributions, 1500, 90, seed=1, chunk_size=500, capacity=(400, 80, 40))
+    first = result.capacity.first_exceeded
+    assert first.shape == (1500, 3)
+
+    soon, later = exceedance_probability(result.capacity, 30), exceedance_probability(result.capacity, 89)
+    assert (soon <= later).all() and 0 < soon[1] < 1
+    np.testing.assert_array_equal(later, (first >= 0).mean(axis=0))
+    assert run_ensemble(distributions, 100, 90, seed=1).capacity is None
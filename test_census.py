@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+
+from renown_chime.census import census_from_admits, los_distribution
+from renown_chime.projections import build_census_table, build_projection
+
+
+def _pandas_census_table(projection_admits, hosp_los, icu_los, vent_los):
+    # the cumsum/shift implementation build_census_table replaced
+    census_dict = dict()
+    for k, los in {"hosp": hosp_los, "icu": icu_los, "vent": vent_los}.items():
+        census = (
+            projection_admits.cumsum().iloc[:-los, :]
+            - projection_admits.cumsum().shift(los).fillna(0)
+        ).apply(np.ceil)
+        census_dict[k] = census[k]
+    census_df = pd.DataFrame(census_dict)
+    census_df["day"] = census_df.index
+    census_df = census_df[["day", "hosp", "icu", "vent"]]
+    census_table = census_df[np.mod(census_df.index, 7) == 0].copy()
+    census_table.index = range(census_table.shape[0])
+    census_table.loc[0, :] = 0
+    return census_table.dropna().astype(int)
+
+
+def test_census_table_matches_pandas_implementation(default_key):
+    for key in [
+        default_key(),
+        default_key(
+            current_hosp=40, doubling_time=3, relative_contact_rate=0.3, hosp_los=3, icu_los=14, vent_los=21,
+            market_share=0.3, n_days=200,
+        ),
+    ]:
+        projection = build_projection(*key)
+        expected = _pandas_census_table(projection.projection_admits, *key[6:9])
+        pd.testing.assert_frame_equal(projection.census_table, expected)
+
+
+def test_los_distribution_is_a_mixture_of_fixed_stays():
+    admits = np.random.default_rng(0).uniform(0, 10, size=(2, 50, 1))
+    admits[:, 0] = np.nan
+    mixed = census_from_admits(admits, [[0, 0, 0.25, 0, 0.75]])
+    expected = 0.25 * census_from_admits(admits, [2]) + 0.75 * census_from_admits(admits, [4])
+    np.testing.assert_allclose(mixed, expected)
+    np.testing.assert_array_equal(los_distribution(3), [0, 0, 0, 1])
+
+
+def test_census_table_accepts_los_distribution(default_key):
+    projection = build_projection(*default_key())
+    table = build_census_table(projection.projection_admits, [0] * 7 + [1], 9, 10)
+    pd.testing.assert_frame_equal(table, projection.census_table)
@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+
+from renown_chime.charts import chart_spec, long_format, new_admissions_chart, peak_indices, spec_cache
+from renown_chime.projections import build_projection
+
+
+def test_peak_indices_bounds_points_and_keeps_extremes():
+    y = np.sin(np.linspace(0, 20, 5000)) * np.linspace(1, 3, 5000)
+    keep = peak_indices(y, max_points=100)
+    assert len(keep) <= 100
+    assert {0, 4999, int(np.argmax(y)), int(np.argmin(y))} <= set(keep)
+    np.testing.assert_array_equal(peak_indices(y[:50], max_points=100), np.arange(50))
+
+
+def test_long_format_drops_nan_and_folds():
+    frame = pd.DataFrame({"day": [0, 1, 2], "a": [np.nan, 1.0, 2.0], "b": [3.0, 4.0, 5.0]})
+    data = long_format(frame, ["a", "b"])
+    assert list(data.columns) == ["day", "key", "value"]
+    assert data["key"].tolist() == ["a", "a", "b", "b", "b"]
+
+
+def test_chart_spec_is_cached_on_data(default_key):
+    admits = build_projection(*default_key(n_days=400)).projection_admits
+    first = chart_spec(new_admissions_chart, admits, 390)
+    hits = spec_cache.hits
+    assert chart_spec(new_admissions_chart, admits.copy(), 390) is first
+    assert spec_cache.hits == hits + 1
+    assert chart_spec(new_admissions_chart, admits, 380) is not first
+    assert len(first.spec["datasets"][first.spec["data"]["name"]]) <= 3 * 120
+    assert first.payload_bytes > 0
@@ -0,0 +1,35 @@
+import numpy as np
+
+from renown_chime.compartments import build_stratified_projection, sim_compartments
+from renown_chime.models import sim_sir
+from renown_chime.projections import build_projection
+
+
+def test_single_stratum_sir_reproduces_sim_sir_exactly(default_key):
+    S, I, gamma = 4119405.0, 533.0, 1 / 14.0
+    beta = (2 ** (1 / 4.0) - 1 + gamma) / S
+    rates = np.r_[np.zeros(30), np.full(170, 0.4)]
+    states = sim_compartments([S, I, 0.0], beta, gamma, 200, beta_decay=0.01, relative_contact_rates=rates)
+    expected = sim_sir(S, I, 0.0, beta, gamma, 200, beta_decay=0.01, relative_contact_rates=rates)
+    for row in range(3):
+        np.testing.assert_array_equal(states[:, row, 0], expected[row])
+
+    projection = build_stratified_projection([S], 0.05, 0.02, 0.01, current_hosp=4, doubling_time=6.0, n_days=90)
+    key = default_key(S=S, n_days=90)
+    np.testing.assert_array_equal(projection.census_table, build_projection(*key).census_table)
+
+
+def test_age_strata_and_seir():
+    populations = np.array([1.0e6, 2.5e6, 0.6e6])
+    contact = np.array([[3.0, 1.0, 0.3], [1.0, 2.0, 0.5], [0.3, 0.5, 1.0]])
+    result = build_stratified_projection(
+        populations, [0.005, 0.03, 0.15], [0.001, 0.01, 0.06], [0.0005, 0.005, 0.03],
+        contact=contact, incubation_days=5, current_hosp=4, n_days=120,
+    )
+    assert result.compartments == ("S", "E", "I", "R")
+    assert result.states.shape == (121, 4, 3)
+    np.testing.assert_allclose(result.states.sum(axis=1), np.broadcast_to(result.states[0].sum(axis=0), (121, 3)))
+    # the oldest stratum sends the most patients per head
+    totals = np.nansum(result.admits_by_stratum[:, :, 0], axis=0)
+    assert (totals / populations).argmax() == 2
+    np.testing.assert_allclose(np.nansum(totals), np.nansum(result.projection_admits["hosp"]))
@@ -0,0 +1,51 @@
+import numpy as np
+
+from renown_chime.ensemble import QuantileSketch, parse_distribution, run_ensemble
+from renown_chime.projections import build_projection
+
+
+def test_sketch_quantiles_within_relative_accuracy():
+    rng = np.random.default_rng(1)
+    values = np.ceil(rng.lognormal(3, 1.5, size=(20000, 4)))
+    values[:100, 0] = 0
+
+    sketch = QuantileSketch((4,), relative_accuracy=0.01)
+    for chunk in np.array_split(values, 7):
+        part = QuantileSketch((4,), relative_accuracy=0.01)
+        part.add(chunk)
+        sketch.merge(part)
+
+    for q in (0.1, 0.5, 0.9):
+        exact = np.quantile(values, q, axis=0, method="lower")
+        np.testing.assert_allclose(sketch.quantile(q), exact, rtol=0.01)
+
+
+def test_parse_distribution():
+    assert parse_distribution("triangular:4,6,9") == ("triangular", 4.0, 6.0, 9.0)
+    assert parse_distribution("7") == ("fixed", 7.0)
+
+
+def test_ensemble_is_reproducible_and_independent_of_workers():
+    distributions = {
+        "doubling_time": parse_distribution("triangular:4,6,9"),
+        "hosp_rate": parse_distribution("uniform:0.03,0.08"),
+        "hosp_los": parse_distribution("normal:7,1.5"),
+    }
+    one = run_ensemble(distributions, 2500, 60, seed=7, chunk_size=1000)
+    two = run_ensemble(distributions, 2500, 60, seed=7, chunk_size=1000, workers=2)
+    other = run_ensemble(distributions, 2500, 60, seed=8, chunk_size=1000)
+
+    np.testing.assert_array_equal(one.sketch.counts, two.sketch.counts)
+    assert one.bands.equals(two.bands)
+    assert not one.bands.equals(other.bands)
+    assert list(one.bands.columns) == ["day", "category", "p10", "p50", "p90"]
+    late = one.bands[one.bands["day"] == 40]
+    assert (late["p10"] <= late["p50"]).all() and (late["p50"] <= late["p90"]).all()
+
+
+def test_ensemble_follows_the_distancing_schedule(default_key):
+    schedule = [(10, 0.5)]
+    fixed = run_ensemble({}, 50, 90, schedule=schedule)
+    expected = build_projection(*default_key(n_days=90, schedule=schedule)).census_table
+    median = fixed.bands[fixed.bands["category"] == "hosp"].set_index("day")["p50"]
+    np.testing.assert_allclose(median[expected["day"][1:]], expected["hosp"][1:], rtol=0.01)
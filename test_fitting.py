@@ -0,0 +1,47 @@
+import time
+
+import numpy as np
+import pytest
+
+from renown_chime.fitting import fit_census, model_census, parse_census
+
+INPUTS = dict(hosp_rate=0.05, market_share=0.15, hosp_los=7, S=4119405)
+
+
+def _observed(n_days, doubling_time, contact_after, change_day):
+    start = np.r_[5.0, np.zeros(n_days - 1)]
+    return np.round(model_census(start, doubling_time, 0.0, contact_after, change_day, **INPUTS)[0])
+
+
+def test_fit_recovers_doubling_time():
+    fit = fit_census(_observed(40, 4.0, 0.0, 40), **INPUTS)
+    assert fit.doubling_time == pytest.approx(4.0, abs=0.05)
+    assert fit.change_day is None
+    assert fit.census.shape == (40,)
+
+
+def test_fit_recovers_change_point_interactively():
+    started = time.perf_counter()
+    fit = fit_census(_observed(60, 5.0, 0.4, 25), change_point=True, **INPUTS)
+    assert time.perf_counter() - started < 2
+    assert fit.doubling_time == pytest.approx(5.0, abs=0.05)
+    assert fit.relative_contact_rate == pytest.approx(0.4, abs=0.02)
+    assert abs(fit.change_day - 25) <= 1
+
+
+def test_parse_census():
+    np.testing.assert_array_equal(parse_census("1, 2,3\n4"), [1, 2, 3, 4])
+    with pytest.raises(ValueError):
+        parse_census("1, two")
+    with pytest.raises(ValueError):
+        fit_census([1, 2], **INPUTS)
+
+
+def test_fit_starts_on_the_first_day_with_patients():
+    observed = _observed(40, 4.0, 0.3, 20)
+    fit = fit_census(np.r_[0.0, 0.0, observed], change_point=True, **INPUTS)
+    assert fit.doubling_time == pytest.approx(4.0, abs=0.05)
+    assert abs(fit.change_day - 22) <= 1
+    assert fit.census.shape == (42,) and (fit.census[:2] == 0).all()
+    with pytest.raises(ValueError):
+        fit_census([0, 0, 0, 1, 2], **INPUTS)
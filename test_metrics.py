@@ -0,0 +1,31 @@
+import urllib.request
+
+from renown_chime import metrics
+from renown_chime.projections import build_projection
+
+
+def test_disabled_metrics_are_no_ops(monkeypatch):
+    monkeypatch.setattr(metrics, "ENABLED", False)
+    assert metrics.timer("sim_sir") is metrics.timer("charts")
+    assert metrics.serve() is None
+    before = metrics.render()
+    metrics.scenarios("batch", 100, 0.1)
+    assert metrics.render() == before
+
+
+def test_stage_timings_and_caches_are_exported(monkeypatch, default_key):
+    monkeypatch.setattr(metrics, "ENABLED", True)
+    build_projection(*default_key())
+    with metrics.timer("charts"):
+        pass
+    text = metrics.render()
+    assert 'chime_stage_seconds_count{stage="sim_sir"}' in text
+    assert 'chime_stage_seconds_bucket{stage="charts",le="+Inf"}' in text
+    assert 'chime_scenarios_total{engine="scalar"}' in text
+    assert 'chime_cache_hit_ratio{cache="projection"}' in text
+
+    server = metrics.serve(port=0)
+    url = "http://127.0.0.1:{}/metrics".format(server.server_address[1])
+    with urllib.request.urlopen(url) as response:
+        assert response.headers["Content-Type"].startswith("text/plain")
+        assert b"# TYPE chime_stage_seconds histogram" in response.read()
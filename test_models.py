@@ -0,0 +1,31 @@
+import numpy as np
+
+from renown_chime.models import sim_sir, sim_sir_batch
+
+
+def test_sim_sir_batch_matches_sim_sir():
+    doubling_times = np.array([3.0, 6.0, 10.0])
+    contact_rates = np.array([0.0, 0.3, 0.6])
+    S, I, R, gamma = 1000000.0, 500.0, 0.0, 1 / 14.0
+    betas = (2 ** (1 / doubling_times) - 1 + gamma) / S * (1 - contact_rates)
+    decays = np.array([0.0, 0.01, 0.05])
+
+    s, i, r = sim_sir_batch(S, I, R, betas, gamma, 200, beta_decay=decays)
+    assert s.shape == (3, 201)
+    for row, (beta, decay) in enumerate(zip(betas, decays)):
+        es, ei, er = sim_sir(S, I, R, beta, gamma, 200, beta_decay=decay)
+        np.testing.assert_array_equal(s[row], es)
+        np.testing.assert_array_equal(i[row], ei)
+        np.testing.assert_array_equal(r[row], er)
+
+
+def test_sim_sir_batch_per_day_beta():
+    S, I, R, gamma = 1000000.0, 500.0, 0.0, 1 / 14.0
+    beta = (2 ** (1 / 5.0) - 1 + gamma) / S
+    schedule = np.full((2, 60), beta)
+    schedule[1, 20:] = beta * 0.5
+
+    s, i, r = sim_sir_batch(S, I, R, schedule, gamma, 60)
+    np.testing.assert_array_equal(i[0], sim_sir(S, I, R, beta, gamma, 60)[1])
+    np.testing.assert_array_equal(i[1, :21], i[0, :21])
+    assert i[1, -1] < i[0, -1]
@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from renown_chime.ode import get_ode_beta, sim_sir_ode, sim_sir_ode_batch
+from renown_chime.parameters import DEFAULTS
+from renown_chime.projections import build_projection, build_projection_batch
+
+S, I, GAMMA = 4119405.0, 533.0, 1 / 14.0
+
+
+def test_engines_agree_and_keep_the_doubling_time():
+    beta = get_ode_beta(2.0, 0.0, S, GAMMA)
+    reference = sim_sir_ode(S, I, 0, beta, GAMMA, 365, method="rk45", rtol=1e-10, atol=1e-8)
+    s, i, r = sim_sir_ode(S, I, 0, beta, GAMMA, 365, method="rk4")
+    np.testing.assert_allclose(i, reference[1], rtol=0, atol=1e-5 * i.max())
+    np.testing.assert_allclose(s + i + r, S + I)
+    assert i[4] / i[2] == pytest.approx(2.0, rel=0.01)  # before S runs down
+
+
+def test_scalar_and_batch_paths_match():
+    betas = get_ode_beta(np.array([3.0, 6.0]), np.array([0.0, 0.3]), S, GAMMA)
+    for method in ("rk4", "rk45"):
+        batch = sim_sir_ode_batch(S, I, 0, betas, GAMMA, 200, method=method)
+        for row, beta in enumerate(betas):
+            single = sim_sir_ode(S, I, 0, beta, GAMMA, 200, method=method)
+            np.testing.assert_allclose(batch[1][row], single[1], rtol=1e-6)  # rk45 steps differ in a batch
+
+
+def test_rk45_scenario_does_not_depend_on_its_batch_mates():
+    beta = get_ode_beta(2.0, 0.0, S, GAMMA)
+    alone = sim_sir_ode_batch(S, I, 0, [beta], GAMMA, 200, method="rk45")[1][0]
+    quiet = sim_sir_ode_batch(S, np.r_[I, np.zeros(99)], 0, np.full(100, beta), GAMMA, 200, method="rk45")[1][0]
+    np.testing.assert_allclose(quiet, alone, rtol=1e-9, atol=1e-9 * alone.max())
+
+
+def test_build_projection_with_ode_engine(default_key):
+    key = default_key(n_days=1095, engine="rk4")
+    projection = build_projection(*key)
+    assert projection.i.shape == (1096,)
+    assert len(projection.census_table) > 150
+    batch = build_projection_batch(**dict(DEFAULTS, n_days=1095), engine="rk4")
+    np.testing.assert_allclose(batch.i[0], projection.i, rtol=1e-9)
+    with pytest.raises(ValueError):
+        build_projection(*default_key(engine="rk2"))
@@ -0,0 +1,81 @@
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from renown_chime.cache import LRUCache
+from renown_chime.parameters import DEFAULTS
+from renown_chime.projections import (
+    build_projection, cached_projection, census_cache, projection_cache, trajectory_cache,
+)
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    calls = []
+
+    def compute(key):
+        return lambda: calls.append(key) or key
+
+    assert cache.get(("a",), compute("a")) == "a"
+    assert cache.get(("b",), compute("b")) == "b"
+    assert cache.get(("a",), compute("a")) == "a"
+    cache.get(("c",), compute("c"))  # evicts "b", the least recently used
+    cache.get(("b",), compute("b"))
+    assert calls == ["a", "b", "c", "b"]
+    assert (cache.hits, cache.misses, len(cache)) == (1, 4, 2)
+
+
+def test_build_projection_census_table(default_key):
+    key = default_key()
+    projection = build_projection(*key)
+    assert projection.s.shape == (61,)
+    assert list(projection.census_table.columns) == ["day", "hosp", "icu", "vent"]
+    assert projection.census_table.iloc[0].sum() == 0
+
+
+def test_cached_projection_hits_on_normalized_inputs():
+    inputs = dict(DEFAULTS, n_days=45)
+    projection = cached_projection(**inputs)
+    hits = projection_cache.hits
+    assert cached_projection(**{name: float(value) for name, value in inputs.items()}) is projection
+    assert projection_cache.hits == hits + 1
+    assert not projection.s.flags.writeable  # shared between sessions
+
+
+def assert_same_projection(a, b):
+    for x, y in zip(a[:3], b[:3]):
+        np.testing.assert_array_equal(x, y)
+    assert a.projection_admits.equals(b.projection_admits)
+    assert a.census_table.equals(b.census_table)
+
+
+def test_downstream_change_reuses_sir_run(default_key):
+    inputs = dict(current_hosp=5, doubling_time=5.5, relative_contact_rate=0.2, n_days=90)
+    cached_projection(*default_key(**inputs))
+    runs, censuses = trajectory_cache.misses, census_cache.misses
+    projection = cached_projection(*default_key(**inputs, icu_rate=0.03, vent_los=12))
+    assert trajectory_cache.misses == runs and census_cache.misses == censuses + 1
+    assert_same_projection(projection, build_projection(*default_key(**inputs, icu_rate=0.03, vent_los=12)))
+
+
+@pytest.mark.parametrize("engine", ["euler", "rk4"])
+def test_longer_horizon_continues_last_run(engine, default_key):
+    inputs = dict(current_hosp=6, doubling_time=4.5, relative_contact_rate=0.1, beta_decay=0.01,
+                  schedule=[(20, 0.3), (80, 0.1)], engine=engine)
+    runs = trajectory_cache.misses
+    for n_days in (60, 150, 100):
+        projection = cached_projection(*default_key(**inputs, n_days=n_days))
+        assert_same_projection(projection, build_projection(*default_key(**inputs, n_days=n_days)))
+    assert trajectory_cache.misses == runs + 1  # 150 days continue the 60 day run, 100 days are a slice of it
+
+
+def test_core_does_not_import_web_stack():
+    code = "import sys, renown_chime; print('streamlit' in sys.modules or 'altair' in sys.modules)"
+    out = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    assert out.stdout.strip() == "False"
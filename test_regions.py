@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from renown_chime.projections import build_projection
+from renown_chime.regions import (
+    Regions, build_regional_projection, cached_regional_projection, default_regions, parse_regions,
+    regional_census_frame,
+)
+
+RATES = dict(hosp_rate=0.05, icu_rate=0.02, vent_rate=0.01, hosp_los=7, icu_los=9, vent_los=10)
+
+
+def test_one_county_one_facility_matches_build_projection(default_key):
+    regions = Regions(["region"], np.array([4119405.0]), ["Hospital"], np.array([[0.15]]))
+    result = build_regional_projection(regions, current_hosp=4, doubling_time=6.0, n_days=90, **RATES)
+    expected = build_projection(*default_key(n_days=90))
+    np.testing.assert_allclose(result.admits[0, 1:-1], expected.projection_admits[["hosp", "icu", "vent"]].to_numpy()[1:-1])
+    weekly = result.census[0, ::7]
+    table = expected.census_table[["hosp", "icu", "vent"]].to_numpy()
+    assert np.abs(weekly[: len(table)] - table).max() <= 1
+
+
+def test_facilities_split_the_system_census():
+    regions = parse_regions("""
+        county,population,Main,North
+        washoe,486492,0.45,0.10
+        carson,58639,0.20,0.05
+    """)
+    result = build_regional_projection(regions, current_hosp=40, n_days=60, **RATES)
+    assert result.census.shape == (2, 61, 3)
+    np.testing.assert_array_equal(result.system_census, result.census.sum(axis=0))
+    assert (result.census[0, 7:40, 0] > result.census[1, 7:40, 0]).all()
+
+    frame = regional_census_frame(result, every=7)
+    assert set(frame["facility"]) == {"Main", "North", "System"}
+
+
+def test_regions_validation():
+    with pytest.raises(ValueError):
+        parse_regions("county,population,Main,North\nwashoe,486492,0.7,0.5\n")
+    with pytest.raises(ValueError):
+        parse_regions("name,Main\nwashoe,0.7\n")
+    assert default_regions(0.15).market_shares.shape == (5, 1)
+
+
+def test_cached_regional_projection_follows_the_schedule(default_key):
+    regions = Regions(["region"], np.array([4119405.0]), ["Hospital"], np.array([[0.15]]))
+    inputs = dict(current_hosp=4, doubling_time=6.0, n_days=90, **RATES)
+    schedule = ((10, 0.5),)
+    result = cached_regional_projection(regions, schedule=schedule, **inputs)
+    expected = build_projection(*default_key(n_days=90, schedule=schedule))
+    np.testing.assert_allclose(result.admits[0, 1:-1], expected.projection_admits[["hosp", "icu", "vent"]].to_numpy()[1:-1])
+    assert np.nanmax(cached_regional_projection(regions, **inputs).census) > np.nanmax(result.census)
@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+from renown_chime.parameters import DEFAULTS
+from renown_chime.projections import build_projection, build_projection_batch
+from renown_chime.schedules import contact_schedule, contact_schedules, parse_schedule
+
+
+def test_parse_schedule():
+    assert parse_schedule("14:30, 0:0, 45:10") == [(0, 0.0), (14, 0.3), (45, 0.1)]
+    assert parse_schedule(" ") == []
+    with pytest.raises(ValueError):
+        parse_schedule("14-30")
+    np.testing.assert_array_equal(contact_schedule([(2, 0.5), (4, 0.1)], 6, initial=0.2), [0.2, 0.2, 0.5, 0.5, 0.1, 0.1])
+    np.testing.assert_array_equal(
+        contact_schedule([(2, 0.5)], 4, initial=[0.0, 0.2]), [[0.0, 0.0, 0.5, 0.5], [0.2, 0.2, 0.5, 0.5]]
+    )
+
+
+def test_constant_schedule_matches_relative_contact_rate(default_key):
+    plain = build_projection(*default_key(n_days=90, relative_contact_rate=0.3))
+    scheduled = build_projection(*default_key(n_days=90, schedule=[(0, 0.3)]))
+    np.testing.assert_array_equal(scheduled.i, plain.i)
+    np.testing.assert_array_equal(scheduled.census_table, plain.census_table)
+
+
+def test_batch_schedules_match_build_projection(default_key):
+    schedules = [[], [(14, 0.3)], [(14, 0.5), (45, 0.1)]]
+    result = build_projection_batch(**dict(DEFAULTS, n_days=90), contact_rates=contact_schedules(schedules, 90))
+    for row, schedule in enumerate(schedules):
+        expected = build_projection(*default_key(n_days=90, schedule=schedule))
+        np.testing.assert_array_equal(result.i[row], expected.i)
+        census = result.census[row, ::7]
+        expected_hosp = expected.census_table["hosp"].to_numpy()
+        np.testing.assert_array_equal(census[: len(expected_hosp), 0], expected_hosp)
@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+
+from renown_chime.parameters import DEFAULTS
+from renown_chime.projections import build_projection
+from renown_chime.sensitivity import INPUTS, cached_sensitivity, sensitivity_cache, tornado
+
+
+def test_sensitivity_matches_single_projections(default_key):
+    baseline = {name: DEFAULTS[name] for name in INPUTS}
+    result = cached_sensitivity(baseline, 120)
+    assert len(result.table) == 2 * len(INPUTS)
+
+    census = build_projection(*default_key(n_days=120)).census_table
+    assert result.baseline["peak_hosp"] >= census["hosp"].max()
+
+    row = result.table[(result.table["input"] == "doubling_time") & (result.table["side"] == "high")].iloc[0]
+    assert row["value"] == pytest.approx(DEFAULTS["doubling_time"] * 1.2)
+    assert row["peak_hosp"] < result.baseline["peak_hosp"] and row["day_hosp"] > result.baseline["day_hosp"]
+
+    ranked = tornado(result)
+    assert ranked["input"].iloc[0] == "doubling_time"
+    assert np.all(np.diff(ranked["swing"]) <= 0)
+
+    hits = sensitivity_cache.hits
+    assert cached_sensitivity(dict(baseline), 120) is result
+    assert sensitivity_cache.hits == hits + 1
+
+
+def test_sensitivity_follows_the_schedule(default_key):
+    baseline = {name: DEFAULTS[name] for name in INPUTS}
+    schedule = [(10, 0.5)]
+    result = cached_sensitivity(baseline, 120, schedule=schedule)
+    census = build_projection(*default_key(n_days=120, schedule=schedule)).census_table
+    assert result.baseline["peak_hosp"] >= census["hosp"].max()
+    assert result.baseline["peak_hosp"] < cached_sensitivity(baseline, 120).baseline["peak_hosp"]
+    assert cached_sensitivity(baseline, 120, schedule=((10, 0.5),)) is result
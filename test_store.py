@@ -0,0 +1,45 @@
+import sqlite3
+
+import numpy as np
+
+from renown_chime.parameters import DEFAULTS
+from renown_chime.projections import build_projection, projection_key, trajectory_cache
+from renown_chime.store import ScenarioStore, diff, stack_census
+
+
+def test_saved_scenario_reloads_without_simulating(tmp_path, default_key):
+    path = str(tmp_path / "scenarios.sqlite")
+    overrides = dict(n_days=90, schedule=[(14, 0.3)], hosp_los=8)
+    inputs, key = dict(DEFAULTS, **overrides), default_key(**overrides)
+    store = ScenarioStore(path)
+    digest = store.save("monday", inputs)
+    assert ScenarioStore(path).save("same inputs, other replica", dict(inputs, S=float(inputs["S"]))) == digest
+    assert sqlite3.connect(path).execute("SELECT COUNT(*) FROM runs").fetchone() == (1,)
+
+    runs = trajectory_cache.misses
+    snapshot = store.load("monday")
+    assert trajectory_cache.misses == runs
+    expected = build_projection(*key)
+    for x, y in zip(snapshot.projection[:3], expected[:3]):
+        np.testing.assert_array_equal(x, y)
+    assert snapshot.projection.projection_admits.equals(expected.projection_admits)
+    assert snapshot.projection.census_table.equals(expected.census_table)
+    assert projection_key(**snapshot.inputs) == key
+
+
+def test_diff_and_delete(tmp_path):
+    store = ScenarioStore(str(tmp_path / "scenarios.sqlite"))
+    store.save("slow", dict(DEFAULTS, n_days=60))
+    store.save("fast", dict(DEFAULTS, n_days=120, doubling_time=4.0))
+    assert store.names() == ["fast", "slow"]
+
+    snapshots = [store.load(name) for name in store.names()]
+    table = diff(snapshots)
+    assert list(table.columns) == ["fast", "slow"]
+    assert list(table.index[:2]) == ["doubling_time", "n_days"]
+    assert table.loc["peak_hosp", "fast"] > table.loc["peak_hosp", "slow"]
+    assert stack_census(snapshots).shape == (2, 121, 3)
+
+    store.delete("fast")
+    assert store.names() == ["slow"]
+    assert sqlite3.connect(store.path).execute("SELECT COUNT(*) FROM runs").fetchone() == (1,)